@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from prometheus_client import Counter
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.metrics import gauge_family
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_ADAPTIVE = os.getenv("ADMISSION_ADAPTIVE", "false").lower() == "true"
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# (limite de concurrence, taille de file, attente max en s, latence cible en ms)
+ADMISSION_DEFAULTS = {
+    "read": (10, 50, 2.0, 200),
+    "write": (5, 25, 2.0, 500),
+    "export": (2, 2, 1.0, 30000),
+}
+
+# Routes jamais limitées : sondes et métriques doivent répondre sous charge
+UNLIMITED_PATHS = {"/", "/health", "/health/ready", "/health/messaging", "/metrics"}
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requêtes refusées (503) par classe de route",
+    ["route_class", "reason"],
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """Limite de requêtes simultanées avec file d'attente bornée
+
+    En mode adaptatif (AIMD), la limite baisse de façon multiplicative quand la
+    latence dépasse la cible et remonte d'une unité après `limit` requêtes rapides.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        target_latency: float,
+        adaptive: bool = False,
+        min_limit: int = 1,
+        backoff: float = 0.9,
+    ):
+        self.max_limit = limit
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._fast_completions = 0
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise AdmissionRejected("queue_timeout")
+        except asyncio.CancelledError:
+            # Client parti alors que sa place venait de lui être attribuée
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        # _wake() a déjà compté cette requête dans in_flight
+
+    def release(self, latency: Optional[float] = None):
+        self.in_flight -= 1
+        if latency is not None and self.adaptive:
+            self._adapt(latency)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adapt(self, latency: float):
+        if latency > self.target_latency:
+            now = time.monotonic()
+            # Une seule baisse par fenêtre de latence cible, le temps que l'effet se voie
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, int(self.limit * self.backoff))
+                self._last_decrease = now
+                self._fast_completions = 0
+        else:
+            self._fast_completions += 1
+            if self._fast_completions >= self.limit:
+                self._fast_completions = 0
+                self.limit = min(self.max_limit, self.limit + 1)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+        }
+
+
+def build_limiters(
+    adaptive: bool = ADMISSION_ADAPTIVE,
+) -> Dict[str, ConcurrencyLimiter]:
+    """Limiteurs par classe, réglables par ADMISSION_{READ,WRITE,EXPORT}_*"""
+    limiters = {}
+    for route_class, (limit, queue, timeout, target_ms) in ADMISSION_DEFAULTS.items():
+        prefix = f"ADMISSION_{route_class.upper()}"
+        limiters[route_class] = ConcurrencyLimiter(
+            limit=int(os.getenv(f"{prefix}_LIMIT", str(limit))),
+            max_queue=int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+            queue_timeout=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", str(timeout))),
+            target_latency=float(os.getenv(f"{prefix}_TARGET_MS", str(target_ms)))
+            / 1000,
+            adaptive=adaptive,
+        )
+    return limiters
+
+
+def route_class(scope: Scope) -> Optional[str]:
+    path = scope["path"]
+    if path in UNLIMITED_PATHS or path.startswith(("/docs", "/redoc", "/openapi")):
+        return None
+    # Exports et imports : longues requêtes en flux, limitées à part
+    if path.endswith(("/export", "/import")):
+        return "export"
+    if scope["method"] in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+class AdmissionMiddleware:
+    """Borne les requêtes simultanées par classe (lecture, écriture, export)
+
+    Au-delà de la limite, les requêtes attendent dans une file bornée ; si elle est
+    pleine ou que l'attente dépasse le délai, la réponse est un 503 immédiat avec
+    Retry-After plutôt qu'une attente du pool jusqu'à son timeout.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Optional[Dict[str, ConcurrencyLimiter]] = None,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+    ):
+        self.app = app
+        self.limiters = limiters if limiters is not None else admission_limiters
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limiter_class = route_class(scope) if scope["type"] == "http" else None
+        limiter = self.limiters.get(limiter_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            ADMISSION_REJECTED.labels(route_class=limiter_class, reason=e.reason).inc()
+            await self._reject(send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.release(time.perf_counter() - started)
+
+    async def _reject(self, send: Send):
+        body = json.dumps(
+            {"detail": "Service surchargé, réessayez plus tard"}, ensure_ascii=False
+        ).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+admission_limiters = build_limiters() if ADMISSION_ENABLED else {}
+
+
+def admission_collector():
+    for name, documentation in (
+        ("limit", "Limite de concurrence courante par classe de route"),
+        ("in_flight", "Requêtes admises en cours par classe de route"),
+        ("queued", "Requêtes en attente d'admission par classe de route"),
+    ):
+        yield gauge_family(
+            f"admission_{name}",
+            documentation,
+            "route_class",
+            {
+                limiter_class: limiter.stats()[name]
+                for limiter_class, limiter in admission_limiters.items()
+            },
+        )
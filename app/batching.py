@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Batcher:
+    """Regroupe les appels reçus en parallèle en un seul aller-retour SQL par lot
+
+    `flush` reçoit les éléments du lot et renvoie leurs résultats dans le même ordre,
+    ou None si les appelants n'attendent pas de valeur. Un lot part dès `batch_size`
+    éléments ou après `flush_interval` secondes. Avec `isolate_failures`, un lot en
+    échec est rejoué élément par élément : seul l'élément fautif échoue.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], Awaitable[Optional[List[Any]]]],
+        batch_size: int,
+        flush_interval: float,
+        isolate_failures: bool = False,
+    ):
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.isolate_failures = isolate_failures
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Ajoute un élément au lot courant et attend son résultat"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._start_flush
+            )
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.flush([item for item, _ in batch])
+        except Exception as e:
+            if not self.isolate_failures or len(batch) == 1:
+                for _, future in batch:
+                    _resolve(future, error=e)
+                return
+            logger.warning("Batch of %d failed, retrying one by one: %s", len(batch), e)
+            for item, future in batch:
+                try:
+                    results = await self.flush([item])
+                except Exception as e:
+                    _resolve(future, error=e)
+                else:
+                    _resolve(future, results[0] if results is not None else None)
+            return
+
+        for index, (_, future) in enumerate(batch):
+            _resolve(future, results[index] if results is not None else None)
+
+
+def _resolve(
+    future: asyncio.Future, result: Any = None, error: Optional[Exception] = None
+):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(result)
+    else:
+        future.set_exception(error)
@@ -0,0 +1,257 @@
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.changes import record_tombstones, transaction_now
+from app.messaging.events import CUSTOMER_CREATED, CUSTOMER_DELETED, CUSTOMER_UPDATED
+from app.models import ClientModel
+from app.outbox import enqueue_event
+from app.schemas import ClientBase, ClientBulkUpdate
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+CLIENT_FIELDS = list(ClientBase.model_fields)
+
+SUCCESS_STATUSES = {"created", "updated", "deleted"}
+
+clients_table = ClientModel.__table__
+
+
+def client_event_data(
+    client_id: int, values: Mapping[str, Any], **extra: Any
+) -> Dict[str, Any]:
+    """Construit le payload d'un événement customer.* à partir des valeurs d'un client"""
+    data = {"customer_id": client_id}
+    data.update({field: values.get(field) for field in CLIENT_FIELDS})
+    data.update(extra)
+    return data
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def validation_errors(e: ValidationError) -> List[Dict[str, Any]]:
+    return e.errors(include_url=False, include_input=False, include_context=False)
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    succeeded = sum(1 for result in results if result["status"] in SUCCESS_STATUSES)
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
+
+async def bulk_create(
+    db: AsyncSession, items: List[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE
+) -> List[Dict[str, Any]]:
+    """Crée les clients valides par INSERT multi-lignes ... RETURNING, un commit par lot"""
+    results: List[Dict[str, Any]] = [{} for _ in items]
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, ClientBase.model_validate(item).model_dump()))
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "status": "invalid",
+                "error": validation_errors(e),
+            }
+
+    for chunk in _chunks(valid, chunk_size):
+        try:
+            now = await transaction_now(db)
+            rows = [
+                {**values, "created_at": now, "updated_at": now} for _, values in chunk
+            ]
+            result = await db.execute(
+                insert(clients_table).returning(
+                    clients_table.c.id, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+            client_ids = result.scalars().all()
+
+            for (index, values), client_id in zip(chunk, client_ids):
+                enqueue_event(
+                    db,
+                    CUSTOMER_CREATED,
+                    client_event_data(client_id, values, created_at=now.isoformat()),
+                )
+                results[index] = {"index": index, "status": "created", "id": client_id}
+
+            await db.commit()
+
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error("Error bulk creating clients: %s", e)
+            for index, _ in chunk:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": "Erreur lors de la création du client",
+                }
+
+    return results
+
+
+async def bulk_update(
+    db: AsyncSession, items: List[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Met à jour les clients par lots (UPDATE groupés par clé primaire)
+
+    Retourne les résultats par élément et les ids effectivement modifiés.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in items]
+    valid: List[Tuple[int, int, Dict[str, Any]]] = []
+    for index, item in enumerate(items):
+        try:
+            update_item = ClientBulkUpdate.model_validate(item)
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "status": "invalid",
+                "error": validation_errors(e),
+            }
+            continue
+        changes = update_item.model_dump(exclude_unset=True, exclude={"id"})
+        valid.append((index, update_item.id, changes))
+
+    updated_ids: List[int] = []
+    for chunk in _chunks(valid, chunk_size):
+        try:
+            now = await transaction_now(db)
+            ids = {client_id for _, client_id, _ in chunk}
+            current = {
+                row.id: row._mapping
+                for row in await db.execute(
+                    select(clients_table)
+                    .where(clients_table.c.id.in_(ids))
+                    .with_for_update()
+                )
+            }
+
+            # Plusieurs éléments pour un même id sont fusionnés dans l'ordre
+            merged: Dict[int, Dict[str, Any]] = {}
+            for index, client_id, changes in chunk:
+                if client_id not in current:
+                    results[index] = {
+                        "index": index,
+                        "status": "not_found",
+                        "id": client_id,
+                        "error": "Client non trouvé",
+                    }
+                    continue
+                merged.setdefault(client_id, {}).update(changes)
+                results[index] = {"index": index, "status": "updated", "id": client_id}
+
+            if merged:
+                await db.execute(
+                    update(ClientModel),
+                    [
+                        {"id": client_id, **changes, "updated_at": now}
+                        for client_id, changes in merged.items()
+                    ],
+                )
+
+            for client_id, changes in merged.items():
+                old_values = {
+                    field: current[client_id][field] for field in CLIENT_FIELDS
+                }
+                enqueue_event(
+                    db,
+                    CUSTOMER_UPDATED,
+                    client_event_data(
+                        client_id,
+                        {**old_values, **changes},
+                        updated_at=now.isoformat(),
+                        changes=changes,
+                        old_values=old_values,
+                    ),
+                )
+
+            await db.commit()
+            updated_ids.extend(merged)
+
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error("Error bulk updating clients: %s", e)
+            for index, client_id, _ in chunk:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "id": client_id,
+                    "error": "Erreur lors de la mise à jour du client",
+                }
+
+    return results, updated_ids
+
+
+async def bulk_delete(
+    db: AsyncSession, ids: List[int], chunk_size: int = BULK_CHUNK_SIZE
+) -> List[Dict[str, Any]]:
+    """Supprime les clients par lots avec DELETE ... WHERE id IN (...) RETURNING"""
+    results: List[Dict[str, Any]] = []
+    for offset, chunk in enumerate(_chunks(ids, chunk_size)):
+        start = offset * chunk_size
+        try:
+            now = await transaction_now(db)
+            deleted = {
+                row.id: row._mapping
+                for row in await db.execute(
+                    delete(clients_table)
+                    .where(clients_table.c.id.in_(set(chunk)))
+                    .returning(*clients_table.c)
+                )
+            }
+
+            await record_tombstones(db, deleted, now)
+            for client_id, values in deleted.items():
+                enqueue_event(
+                    db,
+                    CUSTOMER_DELETED,
+                    client_event_data(client_id, values, deleted_at=now.isoformat()),
+                )
+
+            await db.commit()
+
+            for index, client_id in enumerate(chunk, start):
+                if client_id in deleted:
+                    results.append(
+                        {"index": index, "status": "deleted", "id": client_id}
+                    )
+                else:
+                    results.append(
+                        {
+                            "index": index,
+                            "status": "not_found",
+                            "id": client_id,
+                            "error": "Client non trouvé",
+                        }
+                    )
+
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error("Error bulk deleting clients: %s", e)
+            results.extend(
+                {
+                    "index": index,
+                    "status": "error",
+                    "id": client_id,
+                    "error": "Erreur lors de la suppression du client",
+                }
+                for index, client_id in enumerate(chunk, start)
+            )
+
+    return results
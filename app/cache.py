@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+# TTL court des entrées lues sur le réplica, qui peuvent être en retard
+CACHE_REPLICA_TTL = float(os.getenv("CACHE_REPLICA_TTL", "2"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+
+class InMemoryCache:
+    """Cache LRU avec expiration, propre au processus"""
+
+    def __init__(self, max_size: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self, prefix: Optional[str] = None):
+        if prefix is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key.startswith(f"{prefix}:")]:
+            del self._entries[key]
+
+
+class RedisCache:
+    """Cache partagé entre réplicas, nécessite le paquet optionnel redis"""
+
+    def __init__(self, url: str = REDIS_URL, ttl: float = CACHE_TTL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+        self.ttl = ttl
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._redis.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        await self._redis.set(key, json.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+    async def clear(self, prefix: str):
+        """Supprime les clés {prefix}:* sans toucher au reste de la base Redis"""
+        keys = []
+        async for key in self._redis.scan_iter(match=f"{prefix}:*", count=500):
+            keys.append(key)
+            if len(keys) >= 500:
+                await self._redis.unlink(*keys)
+                keys = []
+        if keys:
+            await self._redis.unlink(*keys)
+
+
+class ClientCache:
+    """Cache read-through avec protection contre les rafales de miss simultanés"""
+
+    def __init__(self, backend, prefix: str = "client"):
+        self.backend = backend
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _key(self, client_id: int) -> str:
+        return f"{self.prefix}:{client_id}"
+
+    async def peek(self, client_id: int) -> Optional[Any]:
+        """Retourne la valeur en cache sans déclencher de chargement"""
+        if self.backend is None:
+            return None
+        value = await self.backend.get(self._key(client_id))
+        if value is not None:
+            self.hits += 1
+        return value
+
+    async def get_or_load(
+        self,
+        client_id: int,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        ttl: Optional[float] = None,
+    ) -> Optional[Any]:
+        """Retourne la valeur en cache ou la charge une seule fois pour tous les appelants
+
+        `ttl` remplace le TTL du backend pour la valeur chargée.
+        """
+        if self.backend is None:
+            return await loader()
+
+        key = self._key(client_id)
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            # Une invalidation pendant le chargement retire la clé : on ne stocke pas
+            if value is not None and self._inflight.get(key) is future:
+                await self.backend.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Évite l'avertissement "exception never retrieved" sans attente
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def invalidate(self, client_id: int):
+        key = self._key(client_id)
+        self._inflight.pop(key, None)
+        if self.backend is not None:
+            await self.backend.delete(key)
+
+    async def clear(self):
+        self._inflight.clear()
+        if self.backend is not None:
+            await self.backend.clear(self.prefix)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def build_backend(name: str = CACHE_BACKEND):
+    if name == "memory":
+        return InMemoryCache()
+    if name == "redis":
+        return RedisCache()
+    if name == "none":
+        return None
+    raise ValueError(f"Unknown CACHE_BACKEND: {name}")
+
+
+client_cache = ClientCache(build_backend())
@@ -0,0 +1,139 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import dialect_insert
+from app.models import ClientModel, ClientTombstoneModel
+from app.schemas import Client
+
+# Les changements plus récents que ce délai ne sont pas encore servis : une transaction
+# démarrée avant peut encore valider un updated_at antérieur au watermark renvoyé.
+# Sous PostgreSQL, le watermark recule aussi jusqu'au début de la plus ancienne
+# transaction d'écriture en cours : un lot long (bulk, import) horodaté à son début
+# reste couvert.
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "1.0"))
+
+# application_name porté par les transactions d'écriture le temps de leur exécution :
+# les lectures, les exports et les autres services ne retiennent pas le flux
+CHANGES_WRITER_NAME = os.getenv("CHANGES_WRITER_NAME", "customer-api-writer")
+
+# Horodate et marque la transaction en un aller-retour ; now() vaut son xact_start
+WRITE_TRANSACTION_QUERY = text(
+    "SELECT now(), set_config('application_name', :name, true)"
+)
+
+# Horloge de la base et début de la plus ancienne transaction d'écriture en cours
+OLDEST_WRITE_QUERY = text(
+    "SELECT clock_timestamp(), (SELECT min(xact_start) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND application_name = :name "
+    "AND pid <> pg_backend_pid())"
+)
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite renvoie des dates naïves, stockées en UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def transaction_now(db: AsyncSession) -> datetime:
+    """Horodatage des changements écrits par la transaction qui commence
+
+    À appeler avant toute autre requête de la transaction. Sous PostgreSQL, c'est le
+    now() de la base, égal au xact_start que lit settled_watermark, et la transaction
+    est marquée par CHANGES_WRITER_NAME jusqu'à son commit ou son rollback.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return datetime.now(timezone.utc)
+    row = (
+        await db.execute(WRITE_TRANSACTION_QUERY, {"name": CHANGES_WRITER_NAME})
+    ).first()
+    return row[0]
+
+
+async def record_tombstones(
+    db: AsyncSession, client_ids: Iterable[int], deleted_at: datetime
+):
+    """Enregistre la suppression des clients, dans la transaction en cours"""
+    rows = [
+        {"client_id": client_id, "deleted_at": deleted_at} for client_id in client_ids
+    ]
+    if not rows:
+        return
+    statement = dialect_insert(db, ClientTombstoneModel).values(rows)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["client_id"],
+            set_={"deleted_at": statement.excluded.deleted_at},
+        )
+    )
+
+
+async def settled_watermark(db: AsyncSession) -> datetime:
+    """Date jusqu'à laquelle plus aucune transaction ne peut valider de changement"""
+    settle = timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    if db.bind.dialect.name != "postgresql":
+        return datetime.now(timezone.utc) - settle
+    now, oldest = (
+        await db.execute(OLDEST_WRITE_QUERY, {"name": CHANGES_WRITER_NAME})
+    ).first()
+    if oldest is None:
+        return now - settle
+    return min(now, oldest) - settle
+
+
+async def fetch_changes(
+    db: AsyncSession, since: Optional[Tuple[datetime, int]], limit: int
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Clients créés, modifiés ou supprimés après le watermark, triés par (date, id)
+
+    Les deux sources (clients et tombstones) sont lues par leur index (date, id) avec
+    limit + 1 lignes chacune puis fusionnées. Retourne les changements et s'il en
+    reste d'autres.
+    """
+    settled = await settled_watermark(db)
+
+    clients = select(ClientModel).where(ClientModel.updated_at <= settled)
+    tombstones = select(ClientTombstoneModel).where(
+        ClientTombstoneModel.deleted_at <= settled
+    )
+    if since is not None:
+        clients = clients.where(
+            tuple_(ClientModel.updated_at, ClientModel.id) > tuple_(*since)
+        )
+        tombstones = tombstones.where(
+            tuple_(ClientTombstoneModel.deleted_at, ClientTombstoneModel.client_id)
+            > tuple_(*since)
+        )
+
+    changes = []
+    for client in await db.scalars(
+        clients.order_by(ClientModel.updated_at, ClientModel.id).limit(limit + 1)
+    ):
+        created = since is None or _utc(client.created_at) > since[0]
+        changes.append(
+            {
+                "op": "created" if created else "updated",
+                "id": client.id,
+                "changed_at": _utc(client.updated_at),
+                "client": Client.model_validate(client),
+            }
+        )
+    for tombstone in await db.scalars(
+        tombstones.order_by(
+            ClientTombstoneModel.deleted_at, ClientTombstoneModel.client_id
+        ).limit(limit + 1)
+    ):
+        changes.append(
+            {
+                "op": "deleted",
+                "id": tombstone.client_id,
+                "changed_at": _utc(tombstone.deleted_at),
+                "client": None,
+            }
+        )
+
+    changes.sort(key=lambda change: (change["changed_at"], change["id"]))
+    return changes[:limit], len(changes) > limit
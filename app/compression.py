@@ -0,0 +1,54 @@
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class GZipMiddleware:
+    """Compresse en gzip les réponses envoyées d'un seul bloc, jamais les flux
+
+    Une réponse en plusieurs morceaux (/clients/export) passe telle quelle : zlib la
+    retiendrait jusqu'à remplir un bloc et le client n'aurait plus le premier octet
+    tout de suite.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, compresslevel: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get(
+            "accept-encoding", ""
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        initial: Optional[Message] = None
+        started = False
+
+        async def send_compressed(message: Message):
+            nonlocal initial, started
+            if message["type"] == "http.response.start":
+                # Les en-têtes attendent le premier morceau du corps
+                initial = message
+                return
+            if started or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            started = True
+            if not message.get("more_body", False):
+                headers = MutableHeaders(raw=initial["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                body = message.get("body", b"")
+                if len(body) >= self.minimum_size and "content-encoding" not in headers:
+                    body = gzip.compress(body, compresslevel=self.compresslevel)
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+            await send(initial)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,108 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import Request
+
+Timestamp = Union[datetime, str]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _as_utc(value: Timestamp) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # SQLite renvoie des dates naïves, stockées en UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def client_etag(
+    client_id: int, updated_at: Timestamp, variant: Optional[str] = None
+) -> str:
+    """ETag faible d'un client, dérivé de son id et de sa date de mise à jour
+
+    `variant` distingue les représentations partielles (?fields=) de la même version.
+    """
+    version = int(_as_utc(updated_at).timestamp() * 1_000_000)
+    if variant is not None:
+        return f'W/"{client_id}-{version}-{variant}"'
+    return f'W/"{client_id}-{version}"'
+
+
+def page_etag(
+    rows: Iterable[Tuple[int, Timestamp]],
+    has_more: bool,
+    variant: Optional[str] = None,
+) -> str:
+    """ETag faible d'une page de clients, à partir des couples (id, updated_at)"""
+    digest = hashlib.sha1()
+    for client_id, updated_at in rows:
+        version = int(_as_utc(updated_at).timestamp() * 1_000_000)
+        digest.update(f"{client_id}:{version};".encode("ascii"))
+    digest.update(b"more" if has_more else b"end")
+    if variant is not None:
+        digest.update(variant.encode("ascii"))
+    return f'W/"{digest.hexdigest()}"'
+
+
+def validator_headers(etag: str, last_modified: Optional[Timestamp]) -> Dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def has_conditional_headers(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[Timestamp]
+) -> bool:
+    """Applique If-None-Match (prioritaire) puis If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {_strip_weak(tag) for tag in if_none_match.split(",")}
+        return _strip_weak(etag) in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # Last-Modified n'a qu'une précision à la seconde
+        modified = _as_utc(last_modified).replace(microsecond=0)
+        return modified <= since
+
+    return False
+
+
+def if_match_versions(request: Request, client_id: int) -> Optional[List[datetime]]:
+    """Versions (updated_at) du client acceptées par If-Match, None sans condition
+
+    Seule la version compte : un ETag obtenu avec ?fields= convient aussi. Une liste
+    vide signifie qu'aucun ETag fourni ne désigne ce client.
+    """
+    if_match = request.headers.get("if-match")
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        parts = _strip_weak(tag).strip('"').split("-")
+        if len(parts) < 2 or parts[0] != str(client_id) or not parts[1].isdigit():
+            continue
+        versions.append(EPOCH + timedelta(microseconds=int(parts[1])))
+    return versions
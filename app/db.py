@@ -1,7 +1,16 @@
+import logging
 import os
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -9,11 +18,91 @@ Base = declarative_base()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Convertit une URL SQLAlchemy synchrone vers son driver asynchrone"""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    query = dict(parsed.query)
+    # asyncpg ne connaît pas sslmode, son équivalent est le paramètre ssl
+    if drivername == "postgresql+asyncpg" and "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername=drivername, query=query).render_as_string(
+        hide_password=False
+    )
+
+
+def pool_options(url: str, prefix: str = "DB") -> dict:
+    """Réglages du pool d'un engine, lus dans {prefix}_POOL_SIZE, etc.
+
+    Les variables REPLICA_DB_* reprennent par défaut les valeurs DB_*.
+    """
+
+    def setting(name: str, default: str) -> str:
+        return os.getenv(f"{prefix}_{name}", os.getenv(f"DB_{name}", default))
+
+    options = {
+        "pool_pre_ping": setting("POOL_PRE_PING", "false").lower() == "true",
+        "pool_recycle": int(setting("POOL_RECYCLE", "-1")),
+    }
+    # SQLite n'utilise pas de pool dimensionné
+    if not make_url(url).drivername.startswith("sqlite"):
+        options.update(
+            pool_size=int(setting("POOL_SIZE", "5")),
+            max_overflow=int(setting("MAX_OVERFLOW", "10")),
+            pool_timeout=float(setting("POOL_TIMEOUT", "30")),
+        )
+    return options
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
 engine = create_engine(
     DATABASE_URL,
 )
 SessionLocal = sessionmaker(bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Réplica en lecture optionnel : GET routés dessus, écritures sur le primaire
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "10"))
+READ_PRIMARY_COOKIE = "read_primary"
+# Équivalent du cookie pour les appels de service, qui ne gardent pas les cookies
+READ_PRIMARY_HEADER = "X-Read-Primary"
+
+replica_engine = None
+ReplicaSessionLocal = None
+if REPLICA_DATABASE_URL:
+    ASYNC_REPLICA_URL = to_async_url(REPLICA_DATABASE_URL)
+    replica_engine = create_async_engine(
+        ASYNC_REPLICA_URL, **pool_options(ASYNC_REPLICA_URL, "REPLICA_DB")
+    )
+    ReplicaSessionLocal = async_sessionmaker(replica_engine, expire_on_commit=False)
+
+_replica_down_until = 0.0
+
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(db: AsyncSession, model):
+    """INSERT supportant ON CONFLICT pour le dialecte de la session"""
+    return DIALECT_INSERTS[db.bind.dialect.name](model)
+
 
 def get_db():
     db = SessionLocal()
@@ -21,3 +110,66 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def is_primary(db: AsyncSession) -> bool:
+    return db.bind is AsyncSessionLocal.kw["bind"]
+
+
+def reads_pinned(request: Request) -> bool:
+    """Vrai si le client vient d'écrire et doit relire ses écritures sur le primaire
+
+    Le client le signale par le cookie read_primary ou par l'en-tête X-Read-Primary.
+    """
+    if ReplicaSessionLocal is None:
+        return False
+    return request.cookies.get(READ_PRIMARY_COOKIE) is not None or bool(
+        request.headers.get(READ_PRIMARY_HEADER)
+    )
+
+
+def pin_reads_to_primary(response: Response):
+    """Après une écriture, envoie les lectures de ce client au primaire un instant
+
+    L'en-tête X-Read-Primary indique la durée en secondes aux appelants sans cookies,
+    qui le renvoient sur leurs lectures pendant ce délai.
+    """
+    if ReplicaSessionLocal is not None:
+        response.headers[READ_PRIMARY_HEADER] = str(REPLICA_PIN_SECONDS)
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+
+
+async def open_read_session(pinned: bool = False) -> AsyncSession:
+    """Session de lecture : le réplica s'il répond, sinon le primaire"""
+    global _replica_down_until
+    if ReplicaSessionLocal is not None and not pinned:
+        if time.monotonic() >= _replica_down_until:
+            db = ReplicaSessionLocal()
+            try:
+                await db.connection()
+                return db
+            except (DBAPIError, OSError) as e:
+                await db.close()
+                # On ne réessaie pas le réplica à chaque requête pendant la panne
+                _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+                logger.warning("Read replica unavailable, using primary: %s", e)
+    return AsyncSessionLocal()
+
+
+async def get_read_db(request: Request):
+    db = await open_read_session(reads_pinned(request))
+    try:
+        yield db
+    finally:
+        await db.close()
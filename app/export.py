@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from app.db import open_read_session
+from app.models import ClientModel
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = [column.name for column in ClientModel.__table__.columns]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def _iter_batches(batch_size: int, pinned: bool) -> AsyncIterator[list]:
+    """Lit la table par lots avec un curseur serveur, sans la charger en mémoire"""
+    async with await open_read_session(pinned) as db:
+        result = await db.stream(
+            select(ClientModel.__table__).order_by(ClientModel.id),
+            execution_options={"yield_per": batch_size},
+        )
+        async for partition in result.partitions():
+            yield partition
+
+
+def _serialize_value(value):
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+async def iter_ndjson(
+    batch_size: int = EXPORT_BATCH_SIZE, pinned: bool = False
+) -> AsyncIterator[bytes]:
+    async for rows in _iter_batches(batch_size, pinned):
+        lines = []
+        for row in rows:
+            record = {
+                key: _serialize_value(value) for key, value in row._mapping.items()
+            }
+            lines.append(json.dumps(record, ensure_ascii=False))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def iter_csv(
+    batch_size: int = EXPORT_BATCH_SIZE, pinned: bool = False
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # L'en-tête part tout de suite, avant même la fin de la requête SQL
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode("utf-8")
+
+    async for rows in _iter_batches(batch_size, pinned):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow(
+                ["" if value is None else _serialize_value(value) for value in row]
+            )
+        yield buffer.getvalue().encode("utf-8")
+
+
+EXPORTERS = {
+    "ndjson": iter_ndjson,
+    "csv": iter_csv,
+}
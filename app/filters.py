@@ -0,0 +1,59 @@
+from typing import List, Optional
+
+from fastapi import Query
+from sqlalchemy import func, or_
+
+from app.models import ClientModel
+
+
+def escape_like(value: str) -> str:
+    """Échappe les jokers LIKE pour une correspondance littérale"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix(column, value: str):
+    return func.lower(column).like(escape_like(value.lower()) + "%", escape="\\")
+
+
+def _contains(column, value: str):
+    return func.lower(column).like("%" + escape_like(value.lower()) + "%", escape="\\")
+
+
+def client_filters(
+    city: Optional[str] = None,
+    postal_code: Optional[str] = None,
+    company_name: Optional[str] = None,
+    name: Optional[str] = Query(
+        None, min_length=1, description="Préfixe du nom, insensible à la casse"
+    ),
+    last_name: Optional[str] = Query(
+        None,
+        min_length=1,
+        description="Préfixe du nom de famille, insensible à la casse",
+    ),
+    search: Optional[str] = Query(
+        None,
+        min_length=3,
+        description="Sous-chaîne recherchée dans le nom ou le nom de famille",
+    ),
+) -> List:
+    """Conditions SQL des filtres de liste, chacune couverte par un index"""
+    conditions = []
+    if city is not None:
+        conditions.append(ClientModel.city == city)
+    if postal_code is not None:
+        conditions.append(ClientModel.postal_code == postal_code)
+    if company_name is not None:
+        conditions.append(ClientModel.company_name == company_name)
+    if name is not None:
+        conditions.append(_prefix(ClientModel.name, name))
+    if last_name is not None:
+        conditions.append(_prefix(ClientModel.last_name, last_name))
+    if search is not None:
+        conditions.append(
+            or_(
+                _contains(ClientModel.name, search),
+                _contains(ClientModel.last_name, search),
+            )
+        )
+    return conditions
@@ -0,0 +1,23 @@
+import logging
+from typing import Any, Dict
+
+from app.messaging.consumer import EventDispatcher
+from app.messaging.events import ORDER_CANCELLED, ORDER_CREATED, PRODUCT_UPDATED
+from app.order_stats import order_stats_projector
+
+logger = logging.getLogger(__name__)
+
+dispatcher = EventDispatcher()
+
+
+@dispatcher.on(PRODUCT_UPDATED)
+async def handle_product_updated(event: Dict[str, Any]):
+    data = event.get("data", {})
+    logger.info("Product updated: %s", data.get("product_id"))
+
+
+# La projection déduplique elle-même sur event_id (table order_events)
+@dispatcher.on(ORDER_CREATED, ORDER_CANCELLED, idempotent=True)
+async def handle_order_event(event: Dict[str, Any]):
+    """Met à jour la projection locale des statistiques de commandes du client"""
+    await order_stats_projector.submit(event)
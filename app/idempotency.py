@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import InMemoryCache
+from app.db import dialect_insert
+from app.models import IdempotencyKeyModel
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+# Réponses récentes gardées en mémoire : les retries sont rejoués sans requête SQL
+replay_cache = InMemoryCache(
+    max_size=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL_HOURS * 3600
+)
+
+_in_flight: Dict[str, asyncio.Future] = {}
+_last_purge = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def request_fingerprint(payload: Dict[str, Any]) -> str:
+    """Empreinte du corps de la requête, pour refuser une clé réutilisée ailleurs"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@asynccontextmanager
+async def single_flight(key: Optional[str]):
+    """Fait attendre les doublons simultanés d'une clé la fin de la première requête"""
+    if key is None:
+        yield
+        return
+    while key in _in_flight:
+        await asyncio.shield(_in_flight[key])
+    done = asyncio.get_running_loop().create_future()
+    _in_flight[key] = done
+    try:
+        yield
+    finally:
+        del _in_flight[key]
+        done.set_result(None)
+
+
+async def _purge_expired(db: AsyncSession, now: datetime):
+    global _last_purge
+    if now - _last_purge < timedelta(minutes=1):
+        return
+    _last_purge = now
+    await db.execute(
+        delete(IdempotencyKeyModel).where(
+            IdempotencyKeyModel.created_at
+            < now - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+        )
+    )
+
+
+async def claim_key(
+    db: AsyncSession, key: str, fingerprint: str
+) -> Optional[Dict[str, Any]]:
+    """Réserve la clé dans la transaction en cours
+
+    Retourne None si la clé est nouvelle, sinon la réponse enregistrée à rejouer.
+    Sous PostgreSQL, l'INSERT attend la fin d'une transaction concurrente qui aurait
+    réservé la même clé sur un autre réplica.
+    """
+    stored = await replay_cache.get(key)
+    if stored is None:
+        now = datetime.now(timezone.utc)
+        await _purge_expired(db, now)
+        claimed = await db.scalar(
+            dialect_insert(db, IdempotencyKeyModel)
+            .values(key=key, fingerprint=fingerprint, created_at=now)
+            .on_conflict_do_nothing(index_elements=["key"])
+            .returning(IdempotencyKeyModel.key)
+        )
+        if claimed is not None:
+            return None
+        row = await db.get(IdempotencyKeyModel, key)
+        stored = {
+            "fingerprint": row.fingerprint,
+            "status_code": row.status_code,
+            "response": row.response,
+        }
+
+    if stored["fingerprint"] != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail="Clé d'idempotence déjà utilisée pour une autre requête",
+        )
+    return stored
+
+
+async def store_response(
+    db: AsyncSession,
+    key: str,
+    fingerprint: str,
+    status_code: int,
+    response: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Enregistre la réponse avec la clé, à valider dans la même transaction"""
+    await db.execute(
+        update(IdempotencyKeyModel)
+        .where(IdempotencyKeyModel.key == key)
+        .values(status_code=status_code, response=response)
+    )
+    return {
+        "fingerprint": fingerprint,
+        "status_code": status_code,
+        "response": response,
+    }
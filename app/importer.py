@@ -0,0 +1,425 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bulk import CLIENT_FIELDS, client_event_data, clients_table, validation_errors
+from app.changes import transaction_now
+from app.db import AsyncSessionLocal
+from app.log import setup_logging
+from app.messaging.events import CUSTOMER_CREATED, CUSTOMER_UPDATED
+from app.models import ClientModel
+from app.outbox import enqueue_events
+from app.schemas import ClientBase
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_MAX_REJECTED = int(os.getenv("IMPORT_MAX_REJECTED", "1000"))
+IMPORT_READ_SIZE = 64 * 1024
+
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# Table temporaire alimentée par COPY, puis fusionnée dans clients
+staging_table = Table(
+    "client_import_staging",
+    MetaData(),
+    Column("row_number", Integer, nullable=False),
+    *(Column(field, String) for field in CLIENT_FIELDS),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+Record = Tuple[int, Any]
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """(numéro de ligne, objet) pour chaque ligne non vide ; None si JSON invalide"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+
+    def parse(line: str):
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, parse(line)
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield line_number + 1, parse(pending)
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """(numéro de ligne, dictionnaire) pour chaque enregistrement CSV avec en-tête
+
+    Un enregistrement peut s'étendre sur plusieurs lignes (champ entre guillemets) :
+    il est complet quand son nombre de guillemets est pair.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header: Optional[List[str]] = None
+    pending = ""
+    record = ""
+    line_number = 0
+    record_start = 1
+
+    def parse(text: str):
+        values = next(csv.reader([text]), [])
+        if header is None:
+            return values
+        if len(values) != len(header):
+            return None
+        # Le CSV n'a pas de null : une cellule vide vaut None
+        return {key: value or None for key, value in zip(header, values)}
+
+    async def lines():
+        nonlocal pending
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                yield line + "\n"
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    async for line in lines():
+        line_number += 1
+        record += line
+        if record.count('"') % 2:
+            continue
+        text, record = record.rstrip("\r\n"), ""
+        if text.strip():
+            if header is None:
+                header = [name.strip() for name in parse(text)]
+            else:
+                yield record_start, parse(text)
+        record_start = line_number + 1
+
+
+RECORD_READERS = {
+    "ndjson": iter_ndjson_records,
+    "csv": iter_csv_records,
+}
+
+
+async def iter_file(path: str, read_size: int = IMPORT_READ_SIZE):
+    with open(path, "rb") as file:
+        while chunk := file.read(read_size):
+            yield chunk
+
+
+class ImportSummary:
+    def __init__(self, max_rejected: int = IMPORT_MAX_REJECTED):
+        self.processed = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.superseded = 0
+        self.rejected = 0
+        self.rejected_rows: List[Dict[str, Any]] = []
+        self.max_rejected = max_rejected
+        self.started = time.perf_counter()
+
+    def reject(self, row: int, errors: Any):
+        self.rejected += 1
+        if len(self.rejected_rows) < self.max_rejected:
+            self.rejected_rows.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "superseded": self.superseded,
+            "rejected": self.rejected,
+            "rejected_rows": self.rejected_rows,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+        }
+
+
+def _validate(
+    records: List[Record], summary: ImportSummary
+) -> List[Tuple[int, Dict[str, Any]]]:
+    valid = []
+    for row, record in records:
+        if not isinstance(record, dict):
+            summary.reject(row, "Ligne illisible")
+            continue
+        try:
+            valid.append((row, ClientBase.model_validate(record).model_dump()))
+        except ValidationError as e:
+            summary.reject(row, validation_errors(e))
+    return valid
+
+
+async def _copy_to_staging(db: AsyncSession, rows: List[Tuple[int, Dict[str, Any]]]):
+    connection = await db.connection()
+    await connection.run_sync(
+        lambda sync: staging_table.create(
+            sync, checkfirst=sync.dialect.name != "postgresql"
+        )
+    )
+    records = [
+        (row, *(values[field] for field in CLIENT_FIELDS)) for row, values in rows
+    ]
+    if connection.dialect.name == "postgresql":
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            staging_table.name,
+            records=records,
+            columns=[column.name for column in staging_table.columns],
+        )
+    else:
+        # Pas de COPY hors PostgreSQL : INSERT multi-lignes dans la table temporaire
+        await db.execute(
+            insert(staging_table),
+            [dict(zip(staging_table.c.keys(), record)) for record in records],
+        )
+
+
+async def _insert_from_staging(db: AsyncSession, now: datetime) -> List[Dict[str, Any]]:
+    timestamp = literal(now, DateTime(timezone=True))
+    result = await db.execute(
+        insert(clients_table)
+        .from_select(
+            [*CLIENT_FIELDS, "created_at", "updated_at"],
+            select(
+                *(staging_table.c[field] for field in CLIENT_FIELDS),
+                timestamp,
+                timestamp,
+            ).order_by(staging_table.c.row_number),
+        )
+        .returning(clients_table.c.id, *(clients_table.c[f] for f in CLIENT_FIELDS))
+    )
+    created = [dict(row._mapping) for row in result]
+    await db.execute(delete(staging_table))
+    return created
+
+
+async def _split_existing(
+    db: AsyncSession,
+    rows: List[Tuple[int, Dict[str, Any]]],
+    summary: ImportSummary,
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[int, Tuple[Dict, Dict]]]:
+    """Sépare les lignes à créer de celles dont le username existe déjà
+
+    Retourne les lignes à créer et, par id de client existant, (anciennes valeurs,
+    changements). Dans un même lot, la dernière ligne d'un username l'emporte.
+    """
+    last_by_username: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    to_create = []
+    for row, values in rows:
+        if values["username"] is None:
+            to_create.append((row, values))
+            continue
+        if values["username"] in last_by_username:
+            summary.superseded += 1
+        last_by_username[values["username"]] = (row, values)
+    if not last_by_username:
+        return to_create, {}
+
+    existing: Dict[str, Dict[str, Any]] = {}
+    for client in await db.execute(
+        select(clients_table)
+        .where(clients_table.c.username.in_(last_by_username))
+        .order_by(clients_table.c.id)
+        .with_for_update()
+    ):
+        # Plusieurs clients pour un username : le plus ancien est mis à jour
+        existing.setdefault(client.username, dict(client._mapping))
+
+    updates: Dict[int, Tuple[Dict, Dict]] = {}
+    for username, (row, values) in last_by_username.items():
+        current = existing.get(username)
+        if current is None:
+            to_create.append((row, values))
+            continue
+        changes = {
+            field: value for field, value in values.items() if value != current[field]
+        }
+        if changes:
+            old_values = {field: current[field] for field in CLIENT_FIELDS}
+            updates[current["id"]] = (old_values, changes)
+        else:
+            summary.unchanged += 1
+    to_create.sort(key=lambda item: item[0])
+    return to_create, updates
+
+
+async def _merge_chunk(
+    db: AsyncSession,
+    rows: List[Tuple[int, Dict[str, Any]]],
+    upsert: bool,
+    summary: ImportSummary,
+) -> List[int]:
+    """Écrit un lot validé en une transaction et retourne les ids mis à jour"""
+    now = await transaction_now(db)
+    updates: Dict[int, Tuple[Dict, Dict]] = {}
+    if upsert:
+        rows, updates = await _split_existing(db, rows, summary)
+
+    events = []
+    if updates:
+        await db.execute(
+            update(ClientModel),
+            [
+                {"id": client_id, **changes, "updated_at": now}
+                for client_id, (_, changes) in updates.items()
+            ],
+        )
+        events.extend(
+            (
+                CUSTOMER_UPDATED,
+                client_event_data(
+                    client_id,
+                    {**old_values, **changes},
+                    updated_at=now.isoformat(),
+                    changes=changes,
+                    old_values=old_values,
+                ),
+            )
+            for client_id, (old_values, changes) in updates.items()
+        )
+
+    if rows:
+        await _copy_to_staging(db, rows)
+        created = await _insert_from_staging(db, now)
+        events.extend(
+            (
+                CUSTOMER_CREATED,
+                client_event_data(values["id"], values, created_at=now.isoformat()),
+            )
+            for values in created
+        )
+        summary.created += len(created)
+
+    await enqueue_events(db, events)
+    await db.commit()
+    summary.updated += len(updates)
+    return list(updates)
+
+
+async def import_clients(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    format: str,
+    upsert: bool = False,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[Dict[str, Any], List[int]]:
+    """Importe un flux CSV ou NDJSON par lots, sans le charger en entier
+
+    Chaque lot est validé avec ClientBase, chargé par COPY dans une table temporaire
+    puis fusionné dans clients avec ses événements outbox, en une transaction. Avec
+    `upsert`, une ligne dont le username existe met ce client à jour. Retourne le
+    résumé et les ids des clients mis à jour.
+    """
+    summary = ImportSummary()
+    updated_ids: List[int] = []
+    batch: List[Record] = []
+
+    async def flush():
+        valid = _validate(batch, summary)
+        summary.processed += len(batch)
+        batch.clear()
+        if valid:
+            try:
+                updated_ids.extend(await _merge_chunk(db, valid, upsert, summary))
+            except Exception as e:
+                await db.rollback()
+                logger.exception("Error importing clients: %s", e)
+                for row, _ in valid:
+                    summary.reject(row, "Erreur lors de l'enregistrement du lot")
+        if on_progress:
+            on_progress(summary.as_dict())
+
+    async for record in RECORD_READERS[format](chunks):
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            await flush()
+    if batch:
+        await flush()
+    return summary.as_dict(), updated_ids
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Importe des clients depuis un fichier CSV ou NDJSON"
+    )
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(RECORD_READERS))
+    parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="Met à jour les clients dont le username existe déjà",
+    )
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    # La sortie standard est réservée au résumé JSON
+    setup_logging(stream=sys.stderr)
+
+    format = args.format or (
+        "ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv"
+    )
+
+    def progress(summary: Dict[str, Any]):
+        print(
+            f"{summary['processed']} lignes lues, {summary['created']} créées, "
+            f"{summary['updated']} mises à jour, {summary['rejected']} rejetées",
+            file=sys.stderr,
+        )
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            summary, _ = await import_clients(
+                db,
+                iter_file(args.path),
+                format,
+                upsert=args.upsert,
+                chunk_size=args.chunk_size,
+                on_progress=progress,
+            )
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 1 if summary["rejected"] else 0
+
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,70 @@
 import aio_pika
 import json
-from typing import Dict, Any, List, Callable
+import logging
+from typing import Dict, Any, List, Callable, Optional, Sequence
 import uuid
 from datetime import datetime, timezone
 import asyncio
+import time
+
+from app.metrics import BROKER_PUBLISH_DURATION, BROKER_PUBLISH_FAILURES
+
+logger = logging.getLogger(__name__)
+# Un message par événement : échantillonnable via LOG_SAMPLING
+event_logger = logging.getLogger("app.messaging.events")
+
+# Nombre de passages en file de retry, conservé d'une republication à l'autre
+RETRY_COUNT_HEADER = "x-retry-count"
 
 
 class MessageBroker:
     """Client pour la communication via message broker (RabbitMQ)"""
 
-    def __init__(self, connection_url: str, service_name: str):
+    def __init__(
+        self,
+        connection_url: str,
+        service_name: str,
+        pipeline_enabled: bool = False,
+        pipeline_queue_size: int = 1000,
+        pipeline_batch_size: int = 100,
+        confirm_timeout: float = 10.0,
+        prefetch_count: int = 10,
+        retry_delays: Sequence[float] = (),
+    ):
         self.connection_url = connection_url
         self.service_name = service_name
         self.connection = None
         self.channel = None
         self.events_exchange = None
+        self.prefetch_count = prefetch_count
+        # Délais croissants (secondes) avant chaque nouvel essai d'un message en échec
+        self.retry_delays = list(retry_delays)
+        self.events_queue_name = f"{service_name}.events"
+        self.dead_letter_queue_name = f"{self.events_queue_name}.dlq"
+
+        # Mode pipeline : file bornée vidée par lots avec publisher confirms
+        self.pipeline_enabled = pipeline_enabled
+        self.pipeline_queue_size = pipeline_queue_size
+        self.pipeline_batch_size = pipeline_batch_size
+        self.confirm_timeout = confirm_timeout
+        self._publish_queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.stats = {
+            "published": 0,
+            "failed": 0,
+            "batches": 0,
+            "confirm_latency_total": 0.0,
+            "confirm_latency_max": 0.0,
+        }
 
     async def connect(self, max_retries: int = 5, retry_delay: float = 2.0):
         """Établit la connexion avec RabbitMQ avec retry logic"""
         for attempt in range(max_retries):
             try:
-                print(
-                    f"Attempting RabbitMQ connection (attempt {attempt + 1}/{max_retries})"
+                logger.info(
+                    "Attempting RabbitMQ connection (attempt %d/%d)",
+                    attempt + 1,
+                    max_retries,
                 )
 
                 self.connection = await aio_pika.connect_robust(
@@ -30,86 +73,352 @@ class MessageBroker:
                     connection_timeout=10.0,
                     heartbeat=60,
                 )
-                self.channel = await self.connection.channel()
+                self.channel = await self.connection.channel(publisher_confirms=True)
 
-                await self.channel.set_qos(prefetch_count=10)
+                await self.channel.set_qos(prefetch_count=self.prefetch_count)
 
                 self.events_exchange = await self.channel.declare_exchange(
                     "payetonkawa.events", aio_pika.ExchangeType.TOPIC, durable=True
                 )
 
-                print(f"🔗 Message broker connected for service: {self.service_name}")
+                if self.pipeline_enabled:
+                    self._start_flusher()
+
+                logger.info(
+                    "Message broker connected for service: %s", self.service_name
+                )
                 return
 
             except Exception as e:
-                print(f"Connection attempt {attempt + 1} failed: {str(e)}")
+                logger.warning("Connection attempt %d failed: %s", attempt + 1, e)
 
                 if attempt < max_retries - 1:
-                    print(f"⏳ Retrying in {retry_delay} seconds...")
+                    logger.info("Retrying in %s seconds...", retry_delay)
                     await asyncio.sleep(retry_delay)
                     retry_delay *= 1.5
                 else:
-                    print(
-                        f"Failed to connect to message broker after {max_retries} attempts"
+                    logger.error(
+                        "Failed to connect to message broker after %d attempts",
+                        max_retries,
                     )
                     raise
 
-    async def publish_event(self, event_type: str, data: Dict[str, Any]):
-        """Publie un événement sur le message broker"""
-        if not self.events_exchange:
-            raise RuntimeError("Message broker not connected")
-
+    def _build_message(
+        self,
+        event_type: str,
+        data: Dict[str, Any],
+        event_id: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> aio_pika.Message:
         message_body = {
             "event_type": event_type,
-            "event_id": str(uuid.uuid4()),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "event_id": event_id or str(uuid.uuid4()),
+            "timestamp": (timestamp or datetime.now(timezone.utc)).isoformat(),
             "service": self.service_name,
             "data": data,
         }
+        return aio_pika.Message(
+            json.dumps(message_body, ensure_ascii=False).encode("utf-8"),
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            message_id=message_body["event_id"],
+            timestamp=datetime.now(timezone.utc),
+        )
 
-        try:
-            message = aio_pika.Message(
-                json.dumps(message_body, ensure_ascii=False).encode("utf-8"),
-                content_type="application/json",
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                message_id=message_body["event_id"],
-                timestamp=datetime.now(timezone.utc),
-            )
+    async def publish_event(
+        self,
+        event_type: str,
+        data: Dict[str, Any],
+        event_id: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ):
+        """Publie un événement sur le message broker"""
+        if not self.events_exchange:
+            raise RuntimeError("Message broker not connected")
+
+        message = self._build_message(event_type, data, event_id, timestamp)
 
+        if self.pipeline_enabled:
+            await self._enqueue(event_type, message)
+            return
+
+        started = time.perf_counter()
+        try:
             await self.events_exchange.publish(message, routing_key=event_type)
 
-            print(f"Published event: {event_type} | ID: {message_body['event_id']}")
+            event_logger.info(
+                "Published event: %s | ID: %s", event_type, message.message_id
+            )
 
         except Exception as e:
-            print(f"Failed to publish event {event_type}: {str(e)}")
+            self.stats["failed"] += 1
+            BROKER_PUBLISH_FAILURES.labels(event_type=event_type).inc()
+            logger.error("Failed to publish event %s: %s", event_type, e)
             raise
 
+        self.stats["published"] += 1
+        BROKER_PUBLISH_DURATION.labels(event_type=event_type).observe(
+            time.perf_counter() - started
+        )
+
+    async def publish_events(
+        self, events: List[Dict[str, Any]]
+    ) -> List[Optional[Exception]]:
+        """Publie plusieurs événements et retourne l'erreur éventuelle de chacun
+
+        Chaque élément contient event_type, data et optionnellement event_id et
+        timestamp. En mode pipeline, tout le lot est envoyé d'un coup et ses confirms
+        sont attendus ensemble : un nack au milieu du lot n'empêche pas l'envoi des
+        suivants, qui seront republiés avec le même event_id.
+        """
+        if not self.events_exchange:
+            raise RuntimeError("Message broker not connected")
+
+        if not self.pipeline_enabled:
+            results: List[Optional[Exception]] = []
+            for event in events:
+                try:
+                    await self.publish_event(**event)
+                    results.append(None)
+                except Exception as e:
+                    # Les suivants ne sont pas tentés pour préserver l'ordre
+                    results.extend([e] * (len(events) - len(results)))
+                    break
+            return results
+
+        futures = []
+        for event in events:
+            message = self._build_message(**event)
+            futures.append(await self._submit(event["event_type"], message))
+        return list(await asyncio.gather(*futures, return_exceptions=True))
+
+    async def _submit(self, routing_key: str, message: aio_pika.Message):
+        """Ajoute un message à la file du pipeline, en attendant s'il est plein"""
+        future = asyncio.get_running_loop().create_future()
+        await self._publish_queue.put((routing_key, message, future))
+        return future
+
+    async def _enqueue(self, routing_key: str, message: aio_pika.Message):
+        future = await self._submit(routing_key, message)
+        await future
+
+    async def _flush_loop(self):
+        """Publie les messages de la file par lots et attend leurs confirms ensemble"""
+        while True:
+            batch = [await self._publish_queue.get()]
+            while len(batch) < self.pipeline_batch_size:
+                try:
+                    batch.append(self._publish_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            started = time.perf_counter()
+            try:
+                results = await asyncio.gather(
+                    *(
+                        self.events_exchange.publish(
+                            message,
+                            routing_key=routing_key,
+                            timeout=self.confirm_timeout,
+                        )
+                        for routing_key, message, _ in batch
+                    ),
+                    return_exceptions=True,
+                )
+            except asyncio.CancelledError:
+                self._fail_pending(batch)
+                raise
+            latency = time.perf_counter() - started
+
+            self.stats["batches"] += 1
+            self.stats["confirm_latency_total"] += latency
+            self.stats["confirm_latency_max"] = max(
+                self.stats["confirm_latency_max"], latency
+            )
+
+            for (routing_key, message, future), result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    self.stats["failed"] += 1
+                    BROKER_PUBLISH_FAILURES.labels(event_type=routing_key).inc()
+                    logger.error("Failed to publish event %s: %s", routing_key, result)
+                    if not future.done():
+                        future.set_exception(result)
+                else:
+                    self.stats["published"] += 1
+                    BROKER_PUBLISH_DURATION.labels(event_type=routing_key).observe(
+                        latency
+                    )
+                    if not future.done():
+                        future.set_result(None)
+
+    @staticmethod
+    def _fail_pending(items):
+        """Débloque les appelants dont les messages ne seront jamais publiés"""
+        for _, _, future in items:
+            if not future.done():
+                future.set_exception(RuntimeError("Message broker closed"))
+
+    @property
+    def queue_depth(self) -> int:
+        """Nombre de messages en attente dans la file du pipeline"""
+        return self._publish_queue.qsize() if self._publish_queue else 0
+
+    def publisher_stats(self) -> Dict[str, Any]:
+        """Compteurs de publication, profondeur de file et latence des confirms"""
+        batches = self.stats["batches"]
+        return {
+            "pipeline_enabled": self.pipeline_enabled,
+            "queue_depth": self.queue_depth,
+            "published": self.stats["published"],
+            "failed": self.stats["failed"],
+            "batches": batches,
+            "confirm_latency_avg_ms": (
+                round(self.stats["confirm_latency_total"] / batches * 1000, 3)
+                if batches
+                else 0.0
+            ),
+            "confirm_latency_max_ms": round(
+                self.stats["confirm_latency_max"] * 1000, 3
+            ),
+        }
+
     async def subscribe_to_events(self, event_patterns: List[str], callback: Callable):
-        """S'abonne aux événements spécifiés"""
+        """S'abonne aux événements spécifiés
+
+        Déclare aussi les files de retry et la file de rejet (DLQ) utilisées par
+        retry_or_dead_letter. Les arguments de la file principale ne changent pas :
+        une file existante ne peut pas être redéclarée avec d'autres arguments.
+        """
         if not self.channel:
             raise RuntimeError("Message broker not connected")
 
         try:
-            queue_name = f"{self.service_name}.events"
             queue = await self.channel.declare_queue(
-                queue_name, durable=True, exclusive=False
+                self.events_queue_name, durable=True, exclusive=False
             )
+            await self._declare_retry_queues()
 
             for pattern in event_patterns:
                 await queue.bind(self.events_exchange, routing_key=pattern)
-                print(f"Subscribed to pattern: {pattern}")
+                logger.info("Subscribed to pattern: %s", pattern)
 
             await queue.consume(callback)
 
         except Exception as e:
-            print(f"Failed to subscribe to events: {str(e)}")
+            logger.error("Failed to subscribe to events: %s", e)
             raise
 
+    def retry_queue_name(self, attempt: int) -> str:
+        """File d'attente du n-ième essai, nommée d'après son délai
+
+        Changer RETRY_DELAYS crée de nouvelles files plutôt qu'un conflit d'arguments.
+        """
+        delay_ms = int(self.retry_delays[attempt - 1] * 1000)
+        return f"{self.events_queue_name}.retry.{delay_ms}ms"
+
+    async def _declare_retry_queues(self):
+        # Un TTL par file plutôt que par message : RabbitMQ n'expire que la tête de
+        # file, un long délai bloquerait les messages plus courts derrière lui
+        for attempt, delay in enumerate(self.retry_delays, 1):
+            await self.channel.declare_queue(
+                self.retry_queue_name(attempt),
+                durable=True,
+                arguments={
+                    "x-message-ttl": int(delay * 1000),
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self.events_queue_name,
+                },
+            )
+        await self.channel.declare_queue(self.dead_letter_queue_name, durable=True)
+
+    async def retry_or_dead_letter(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        error: Exception,
+        retry: bool = True,
+    ) -> str:
+        """Republie un message en échec vers la file de retry suivante, ou en DLQ
+
+        `retry=False` (message illisible, par exemple) l'envoie directement en DLQ.
+        À l'expiration de son délai, la file de retry renvoie le message dans la file
+        principale via l'échange par défaut. Retourne "retried" ou "dead_lettered" ;
+        le message d'origine peut être acquitté une fois la publication confirmée.
+        """
+        headers = dict(message.headers or {})
+        attempt = int(headers.get(RETRY_COUNT_HEADER) or 0) + 1
+        headers[RETRY_COUNT_HEADER] = attempt
+        headers["x-last-error"] = f"{type(error).__name__}: {error}"[:512]
+
+        if retry and attempt <= len(self.retry_delays):
+            routing_key = self.retry_queue_name(attempt)
+            outcome = "retried"
+        else:
+            routing_key = self.dead_letter_queue_name
+            outcome = "dead_lettered"
+
+        await self.channel.default_exchange.publish(
+            aio_pika.Message(
+                message.body,
+                headers=headers,
+                content_type=message.content_type,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                message_id=message.message_id,
+                timestamp=message.timestamp,
+            ),
+            routing_key=routing_key,
+        )
+        logger.warning(
+            "Event %s %s (attempt %d) to %s",
+            message.message_id,
+            outcome,
+            attempt,
+            routing_key,
+        )
+        return outcome
+
+    async def subscribe_broadcast(self, event_patterns: List[str], callback: Callable):
+        """S'abonne via une file exclusive à cette instance : chaque réplica reçoit tout"""
+        if not self.channel:
+            raise RuntimeError("Message broker not connected")
+
+        try:
+            queue = await self.channel.declare_queue(
+                exclusive=True, auto_delete=True, durable=False
+            )
+
+            for pattern in event_patterns:
+                await queue.bind(self.events_exchange, routing_key=pattern)
+                logger.info("Subscribed to broadcast pattern: %s", pattern)
+
+            await queue.consume(callback)
+
+        except Exception as e:
+            logger.error("Failed to subscribe to broadcast events: %s", e)
+            raise
+
+    def _start_flusher(self):
+        if self._publish_queue is None:
+            self._publish_queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
     async def close(self):
         """Ferme la connexion proprement"""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._publish_queue:
+            pending = []
+            while not self._publish_queue.empty():
+                pending.append(self._publish_queue.get_nowait())
+            self._fail_pending(pending)
         if self.connection and not self.connection.is_closed:
             await self.connection.close()
-            print(f"Message broker connection closed for {self.service_name}")
+            logger.info("Message broker connection closed for %s", self.service_name)
 
     @property
     def is_connected(self) -> bool:
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Set, Tuple
+
+from app.messaging.events import CUSTOMER_DELETED, CUSTOMER_UPDATED
+
+# Un événement à publier : arguments de MessageBroker.publish_event
+Event = Dict[str, Any]
+
+
+def merge_updates(updates: List[Event]) -> Event:
+    """Fusionne des customer.updated successifs d'un même client en un seul
+
+    Le résultat porte l'état et l'identifiant du dernier, l'ensemble des champs
+    modifiés (la dernière valeur l'emporte) et les old_values du premier.
+    """
+    if len(updates) == 1:
+        return updates[0]
+    first, last = updates[0], updates[-1]
+    changes: Dict[str, Any] = {}
+    for update in updates:
+        changes.update(update["data"].get("changes") or {})
+    data = {
+        **last["data"],
+        "changes": changes,
+        "old_values": first["data"].get("old_values"),
+        "coalesced_event_ids": [update["event_id"] for update in updates],
+    }
+    return {**last, "data": data}
+
+
+class _UpdateGroup:
+    def __init__(self):
+        self.updates: List[Event] = []
+        self.closed = False
+
+    @property
+    def event_ids(self) -> List[str]:
+        return [update["event_id"] for update in self.updates]
+
+
+def coalesce(
+    events: List[Event], now: datetime, window: float
+) -> Tuple[List[Tuple[Event, List[str]]], Set[str]]:
+    """Regroupe les customer.updated d'un client arrivés dans la fenêtre `window`
+
+    `events` est dans l'ordre de l'outbox. Retourne les événements à publier, dans
+    l'ordre, chacun avec les event_id de l'outbox qu'il couvre, et les event_id
+    retenus pour l'instant. Un groupe de mises à jour est retenu tant que la première
+    a moins de `window` secondes ; un customer.deleted couvre les mises à jour en
+    attente du client, qui ne sont pas publiées.
+    """
+    output: List[Any] = []
+    open_groups: Dict[Any, _UpdateGroup] = {}
+
+    for event in events:
+        customer_id = event["data"].get("customer_id")
+        group = open_groups.get(customer_id)
+
+        if event["event_type"] == CUSTOMER_UPDATED and customer_id is not None:
+            if group is None:
+                group = open_groups[customer_id] = _UpdateGroup()
+                output.append(group)
+            group.updates.append(event)
+            continue
+
+        covered = [event["event_id"]]
+        if group is not None:
+            del open_groups[customer_id]
+            if event["event_type"] == CUSTOMER_DELETED:
+                output.remove(group)
+                covered = group.event_ids + covered
+            else:
+                # Un autre événement suit : le groupe ne peut plus attendre derrière lui
+                group.closed = True
+        output.append((event, covered))
+
+    publish: List[Tuple[Event, List[str]]] = []
+    held: Set[str] = set()
+    horizon = now - timedelta(seconds=window)
+    for item in output:
+        if not isinstance(item, _UpdateGroup):
+            publish.append(item)
+        elif not item.closed and item.updates[0]["timestamp"] > horizon:
+            held.update(item.event_ids)
+        else:
+            publish.append((merge_updates(item.updates), item.event_ids))
+    return publish, held
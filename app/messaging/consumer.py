@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import aio_pika
+
+from app.log import event_id_var
+from app.metrics import CONSUMER_EVENT_DURATION
+
+logger = logging.getLogger(__name__)
+# Un message par événement : échantillonnable via LOG_SAMPLING
+event_logger = logging.getLogger("app.messaging.events")
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+# Reçoit le message en échec et son erreur, retourne "retried" ou "dead_lettered" ;
+# retry=False envoie directement en file de rejet
+FailureHandler = Callable[..., Awaitable[str]]
+
+PARTITION_FIELDS = ("customer_id", "order_id", "product_id")
+
+
+class EventDispatcher:
+    """Associe chaque type d'événement à son handler"""
+
+    def __init__(self):
+        self._handlers: Dict[str, EventHandler] = {}
+        self._idempotent: Set[str] = set()
+
+    def on(self, *event_types: str, idempotent: bool = False):
+        """Décorateur enregistrant un handler pour un ou plusieurs types d'événements
+
+        `idempotent=True` signale un handler qui écarte lui-même les redélivrances :
+        le consumer ne consulte alors pas le registre des événements traités.
+        """
+
+        def register(handler: EventHandler) -> EventHandler:
+            for event_type in event_types:
+                self._handlers[event_type] = handler
+                if idempotent:
+                    self._idempotent.add(event_type)
+            return handler
+
+        return register
+
+    def handler_for(self, event_type: str) -> Optional[EventHandler]:
+        return self._handlers.get(event_type)
+
+    def is_idempotent(self, event_type: str) -> bool:
+        return event_type in self._idempotent
+
+    @property
+    def event_types(self):
+        return list(self._handlers)
+
+
+def partition_key(event: Dict[str, Any]) -> str:
+    """Clé d'ordonnancement : les événements d'une même clé sont traités dans l'ordre"""
+    data = event.get("data") or {}
+    for field in PARTITION_FIELDS:
+        if data.get(field) is not None:
+            return f"{field}:{data[field]}"
+    return f"event:{event.get('event_id')}"
+
+
+class ConcurrentConsumer:
+    """Callback de consommation traitant les messages en parallèle
+
+    Le nombre de handlers actifs est borné par `concurrency`. Les messages d'une même
+    clé (un client par exemple) sont traités dans leur ordre d'arrivée, ceux de clés
+    différentes en parallèle.
+
+    Avec `processed_events`, un event_id déjà traité est acquitté sans rappeler le
+    handler. Avec `on_failure`, un message en échec est republié pour un nouvel essai
+    ou en file de rejet avant d'être acquitté, au lieu d'être perdu.
+    """
+
+    def __init__(
+        self,
+        dispatcher: EventDispatcher,
+        concurrency: int = 10,
+        key_func: Callable[[Dict[str, Any]], str] = partition_key,
+        rate_window: float = 60.0,
+        processed_events=None,
+        on_failure: Optional[FailureHandler] = None,
+    ):
+        self.dispatcher = dispatcher
+        self.concurrency = concurrency
+        self.key_func = key_func
+        self.rate_window = rate_window
+        self.processed_events = processed_events
+        self.on_failure = on_failure
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tails: Dict[str, asyncio.Future] = {}
+        self._completed = deque(maxlen=100_000)
+        self.stats = {
+            "received": 0,
+            "processed": 0,
+            "failed": 0,
+            "ignored": 0,
+            "duplicates": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "in_flight": 0,
+            "last_lag": 0.0,
+            "max_lag": 0.0,
+        }
+
+    async def __call__(self, message: aio_pika.abc.AbstractIncomingMessage):
+        self.stats["received"] += 1
+        try:
+            event = json.loads(message.body.decode())
+        except json.JSONDecodeError as e:
+            logger.warning("Invalid JSON in message")
+            self.stats["failed"] += 1
+            if self.on_failure is None:
+                await message.reject(requeue=False)
+                return
+            # Aucun nouvel essai ne le rendra lisible : directement en file de rejet
+            async with message.process(ignore_processed=True):
+                await self._handle_failure(message, e, retry=False)
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        # On s'inscrit derrière le message précédent de la même clé avant tout await
+        key = self.key_func(event)
+        previous = self._tails.get(key)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[key] = done
+        try:
+            if previous is not None:
+                await previous
+            async with self._semaphore:
+                await self._process(message, event)
+        finally:
+            done.set_result(None)
+            if self._tails.get(key) is done:
+                del self._tails[key]
+
+    async def _process(
+        self, message: aio_pika.abc.AbstractIncomingMessage, event: Dict[str, Any]
+    ):
+        event_type = event.get("event_type")
+        handler = self.dispatcher.handler_for(event_type)
+
+        async with message.process(ignore_processed=True):
+            if handler is None:
+                self.stats["ignored"] += 1
+                return
+
+            event_id = event.get("event_id")
+            token = event_id_var.set(event_id)
+            self.stats["in_flight"] += 1
+            started = time.perf_counter()
+            outcome = "processed"
+            try:
+                if await self._already_processed(event_type, event_id):
+                    outcome = "duplicate"
+                    self.stats["duplicates"] += 1
+                    event_logger.info("Duplicate event skipped: %s", event_type)
+                    return
+
+                event_logger.info(
+                    "Received event: %s from %s", event_type, event.get("service")
+                )
+                await handler(event)
+                self.stats["processed"] += 1
+                self._completed.append(time.monotonic())
+                self._record_lag(event)
+                await self._record_processed(event_type, event_id)
+            except Exception as e:
+                outcome = "failed"
+                self.stats["failed"] += 1
+                logger.exception("Error processing event %s: %s", event_type, e)
+                await self._handle_failure(message, e)
+            finally:
+                event_id_var.reset(token)
+                self.stats["in_flight"] -= 1
+                CONSUMER_EVENT_DURATION.labels(
+                    event_type=event_type, outcome=outcome
+                ).observe(time.perf_counter() - started)
+
+    def _tracks(self, event_type: str, event_id: Optional[str]) -> bool:
+        return (
+            self.processed_events is not None
+            and bool(event_id)
+            and not self.dispatcher.is_idempotent(event_type)
+        )
+
+    async def _already_processed(
+        self, event_type: str, event_id: Optional[str]
+    ) -> bool:
+        if not self._tracks(event_type, event_id):
+            return False
+        return await self.processed_events.seen(event_id)
+
+    async def _record_processed(self, event_type: str, event_id: Optional[str]):
+        if not self._tracks(event_type, event_id):
+            return
+        try:
+            await self.processed_events.record(event_id, event_type)
+        except Exception as e:
+            # Le traitement a réussi : le refaire serait pire qu'un doublon possible
+            logger.warning("Could not record processed event %s: %s", event_id, e)
+
+    async def _handle_failure(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        error: Exception,
+        retry: bool = True,
+    ):
+        if self.on_failure is None:
+            return
+        try:
+            self.stats[await self.on_failure(message, error, retry=retry)] += 1
+        except Exception as e:
+            # Republication impossible : le message revient dans la file principale
+            logger.error("Could not schedule retry, requeuing message: %s", e)
+            await message.nack(requeue=True)
+
+    def _record_lag(self, event: Dict[str, Any]):
+        """Délai entre la publication de l'événement et la fin de son traitement"""
+        try:
+            published_at = datetime.fromisoformat(event["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            return
+        if published_at.tzinfo is None:
+            published_at = published_at.replace(tzinfo=timezone.utc)
+        lag = (datetime.now(timezone.utc) - published_at).total_seconds()
+        self.stats["last_lag"] = lag
+        self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+
+    def throughput(self) -> float:
+        """Événements traités par seconde sur la fenêtre glissante"""
+        cutoff = time.monotonic() - self.rate_window
+        while self._completed and self._completed[0] < cutoff:
+            self._completed.popleft()
+        return len(self._completed) / self.rate_window
+
+    def consumer_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "pending_keys": len(self._tails),
+            "throughput_per_second": round(self.throughput(), 3),
+        }
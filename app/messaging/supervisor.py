@@ -0,0 +1,79 @@
+import logging
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerSupervisor:
+    """Connecte le broker en tâche de fond, sans bloquer le démarrage de l'API
+
+    Chaque tentative échouée est suivie d'une attente croissante, plafonnée à
+    `max_delay`. Une fois connecté, `on_connected` déclare les abonnements ; la
+    connexion robuste d'aio-pika se charge ensuite des reconnexions et restaure
+    les files et consommateurs déclarés.
+    """
+
+    def __init__(
+        self,
+        broker,
+        on_connected: Callable[[], Awaitable[None]],
+        initial_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.broker = broker
+        self.on_connected = on_connected
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.state = "stopped"
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self.state = "connecting"
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.state = "stopped"
+
+    async def _run(self):
+        delay = self.initial_delay
+        while True:
+            self.attempts += 1
+            try:
+                if not self.broker.is_connected:
+                    await self.broker.connect(max_retries=1)
+                await self.on_connected()
+                self.state = "connected"
+                self.last_error = None
+                logger.info("Message broker ready after %d attempt(s)", self.attempts)
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                # Repartir d'une connexion neuve plutôt que de doubler des abonnements
+                if self.broker.is_connected:
+                    try:
+                        await self.broker.close()
+                    except Exception:
+                        pass
+                logger.warning(
+                    "Message broker unavailable, retrying in %.1fs: %s", delay, e
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+        }
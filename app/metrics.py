@@ -0,0 +1,233 @@
+import logging
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily, Metric
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Versions de SQLAlchemy dont le Pool._do_get privé a été vérifié
+POOL_PATCH_VERSIONS = {(2, 0)}
+
+
+class _CallbackCollector:
+    """Collecteur prometheus_client dont les familles sont calculées au scrape"""
+
+    def __init__(self, collect: Callable[[], Iterable[Metric]]):
+        self._collect = collect
+
+    def collect(self) -> Iterable[Metric]:
+        try:
+            return list(self._collect())
+        except Exception as e:
+            logger.exception("Metrics collector failed: %s", e)
+            return []
+
+    def describe(self) -> Iterable[Metric]:
+        # Pas d'appel à collect() à l'enregistrement, avant le démarrage de l'app
+        return []
+
+
+def register_collector(
+    collect: Callable[[], Iterable[Metric]],
+    registry: CollectorRegistry = REGISTRY,
+):
+    """Ajoute une fonction renvoyant des familles de métriques au moment du scrape"""
+    registry.register(_CallbackCollector(collect))
+
+
+def gauge_family(
+    name: str, documentation: str, label: str, samples: Dict[str, float]
+) -> GaugeMetricFamily:
+    """Famille de gauges avec une valeur par valeur du label"""
+    family = GaugeMetricFamily(name, documentation, labels=[label])
+    for value_label, value in samples.items():
+        family.add_metric([value_label], value)
+    return family
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Durée des requêtes HTTP par route",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requêtes HTTP en cours de traitement par route",
+    ["method", "route"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Durée des requêtes SQL par type d'instruction",
+    ["operation"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Attente pour obtenir une connexion du pool SQLAlchemy",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+BROKER_PUBLISH_DURATION = Histogram(
+    "broker_publish_duration_seconds",
+    "Durée de publication d'un événement, confirm du broker compris",
+    ["event_type"],
+)
+BROKER_PUBLISH_FAILURES = Counter(
+    "broker_publish_failures_total",
+    "Publications d'événements en échec",
+    ["event_type"],
+)
+CONSUMER_EVENT_DURATION = Histogram(
+    "consumer_event_duration_seconds",
+    "Durée de traitement des événements consommés par type",
+    ["event_type", "outcome"],
+)
+
+
+def _statement_operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def instrument_engine(engine):
+    """Mesure les requêtes SQL et l'attente de connexion d'un engine SQLAlchemy"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    # Début de chaque instruction en cours, par contexte d'exécution : une instruction
+    # en échec (handle_error) ne laisse pas d'entrée derrière elle
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start", {})[context] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        _observe_query(conn, context, statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        if exception_context.connection is not None:
+            _observe_query(
+                exception_context.connection,
+                exception_context.execution_context,
+                exception_context.statement,
+            )
+
+    pool = sync_engine.pool
+    # Le pool n'émet pas d'événement avant la prise de connexion : on chronomètre
+    # directement l'obtention, attente de place libre comprise. _do_get est privé :
+    # le remplacement n'est fait que sur les versions où il a été vérifié
+    if _patchable_pool(pool):
+        do_get = pool._do_get
+
+        def _timed_do_get():
+            started = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+        pool._do_get = _timed_do_get
+    else:
+        logger.warning(
+            "Pool checkout wait not measured for %s (SQLAlchemy %s)",
+            type(pool).__name__,
+            _sqlalchemy_version(),
+        )
+
+
+def _observe_query(conn, context, statement: Optional[str]):
+    started = conn.info.get("query_start", {}).pop(context, None)
+    if started is not None:
+        DB_QUERY_DURATION.labels(
+            operation=_statement_operation(statement or "")
+        ).observe(time.perf_counter() - started)
+
+
+def _sqlalchemy_version() -> str:
+    import sqlalchemy
+
+    return sqlalchemy.__version__
+
+
+def _patchable_pool(pool) -> bool:
+    version = tuple(int(part) for part in _sqlalchemy_version().split(".")[:2])
+    return version in POOL_PATCH_VERSIONS and callable(
+        getattr(type(pool), "_do_get", None)
+    )
+
+
+def pool_collector(engines: Dict[str, object]):
+    """Collecteur de l'état des pools (taille, connexions prises, débordement)
+
+    `engines` associe un nom (primary, replica) à chaque engine, repris en label.
+    """
+    pools = {
+        name: getattr(engine, "sync_engine", engine) for name, engine in engines.items()
+    }
+
+    def collect():
+        for metric, attribute, documentation in (
+            ("db_pool_size", "size", "Taille configurée du pool"),
+            ("db_pool_checked_out", "checkedout", "Connexions actuellement prises"),
+            ("db_pool_overflow", "overflow", "Connexions en débordement du pool"),
+            ("db_pool_checked_in", "checkedin", "Connexions libres dans le pool"),
+        ):
+            samples = {
+                name: getattr(engine.pool, attribute)()
+                for name, engine in pools.items()
+                if hasattr(engine.pool, attribute)
+            }
+            if samples:
+                yield gauge_family(metric, documentation, "engine", samples)
+
+    return collect
+
+
+def route_template(scope: Scope) -> str:
+    """Chemin déclaré de la route (/clients/{client_id}), pour borner la cardinalité"""
+    app = scope.get("app")
+    routes = getattr(getattr(app, "router", None), "routes", [])
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI mesurant latence et requêtes en cours par route"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method=method, route=route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(
+                method=method, route=route, status=str(status["code"])
+            ).observe(time.perf_counter() - started)
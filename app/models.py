@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, DDL, event, func
 from datetime import datetime, timezone
 from app.db import Base
 
@@ -17,11 +17,141 @@ class ClientModel(Base):
     profile_last_name = Column(String, nullable=True)
     company_name = Column(String, nullable=True)
     created_at = Column(
-        DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
     )
     updated_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
         nullable=False,
     )
+
+    __table_args__ = (
+        Index("ix_clients_city", "city"),
+        Index("ix_clients_postal_code", "postal_code"),
+        Index("ix_clients_company_name", "company_name"),
+        # Recherche par préfixe insensible à la casse : LIKE 'abc%' sur lower(...)
+        Index(
+            "ix_clients_name_lower",
+            func.lower(name).label("name_lower"),
+            postgresql_ops={"name_lower": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_clients_last_name_lower",
+            func.lower(last_name).label("last_name_lower"),
+            postgresql_ops={"last_name_lower": "text_pattern_ops"},
+        ),
+        # Flux de changements : parcours ordonné par (updated_at, id)
+        Index("ix_clients_updated_at_id", "updated_at", "id"),
+    )
+
+
+# Recherche par sous-chaîne : index trigrammes, disponibles uniquement sous PostgreSQL
+event.listen(
+    ClientModel.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+for _column in ("name", "last_name"):
+    event.listen(
+        ClientModel.__table__,
+        "after_create",
+        DDL(
+            f"CREATE INDEX IF NOT EXISTS ix_clients_{_column}_trgm "
+            f"ON clients USING gin (lower({_column}) gin_trgm_ops)"
+        ).execute_if(dialect="postgresql"),
+    )
+
+
+class OutboxEventModel(Base):
+    """Événements à publier, écrits dans la même transaction que le client"""
+
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(String(36), nullable=False, unique=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Seules les lignes non envoyées sont parcourues par le relais
+        Index(
+            "ix_outbox_events_pending",
+            "id",
+            postgresql_where=sent_at.is_(None),
+            sqlite_where=sent_at.is_(None),
+        ),
+    )
+
+
+class CustomerOrderStatsModel(Base):
+    """Projection locale des commandes d'un client, alimentée par les événements order.*"""
+
+    __tablename__ = "customer_order_stats"
+
+    customer_id = Column(Integer, primary_key=True)
+    order_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+    last_order_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+
+class OrderEventModel(Base):
+    """Événements order.* déjà appliqués à la projection, clé d'idempotence"""
+
+    __tablename__ = "order_events"
+
+    event_id = Column(String(64), primary_key=True)
+    event_type = Column(String, nullable=False)
+    customer_id = Column(Integer, nullable=False, index=True)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    # Date d'enregistrement, pour la purge : un événement ancien reçu tard reste gardé
+    recorded_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class ClientTombstoneModel(Base):
+    """Trace des clients supprimés, lue par le flux de changements"""
+
+    __tablename__ = "client_tombstones"
+
+    client_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_client_tombstones_deleted_at_id", "deleted_at", "client_id"),
+    )
+
+
+class IdempotencyKeyModel(Base):
+    """Réponse enregistrée pour chaque Idempotency-Key de POST /clients"""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class ProcessedEventModel(Base):
+    """Événements consommés avec succès, pour ignorer les redélivrances"""
+
+    __tablename__ = "processed_events"
+
+    event_id = Column(String(64), primary_key=True)
+    event_type = Column(String, nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=False, index=True)
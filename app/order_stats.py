@@ -0,0 +1,175 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.batching import Batcher
+from app.db import AsyncSessionLocal, dialect_insert
+from app.messaging.events import ORDER_CANCELLED, ORDER_CREATED
+from app.models import CustomerOrderStatsModel, OrderEventModel
+
+ORDER_STATS_BATCH_SIZE = int(os.getenv("ORDER_STATS_BATCH_SIZE", "200"))
+ORDER_STATS_FLUSH_INTERVAL = float(os.getenv("ORDER_STATS_FLUSH_INTERVAL", "0.05"))
+# Durée pendant laquelle une redélivrance est reconnue ; à garder au-delà du plus long
+# délai de retry du consumer
+ORDER_EVENTS_RETENTION_HOURS = float(os.getenv("ORDER_EVENTS_RETENTION_HOURS", "168"))
+
+
+def _occurred_at(event: Dict[str, Any]) -> datetime:
+    try:
+        occurred_at = datetime.fromisoformat(event["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return datetime.now(timezone.utc)
+    if occurred_at.tzinfo is None:
+        return occurred_at.replace(tzinfo=timezone.utc)
+    return occurred_at
+
+
+def order_event_row(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Ligne order_events d'un événement, None s'il n'a pas d'event_id ou de client
+
+    Lève ValueError si customer_id n'est pas un entier.
+    """
+    customer_id = (event.get("data") or {}).get("customer_id")
+    if not event.get("event_id") or customer_id is None:
+        return None
+    try:
+        customer_id = int(customer_id)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid customer_id in order event: {customer_id!r}")
+    return {
+        "event_id": event["event_id"],
+        "event_type": event["event_type"],
+        "customer_id": customer_id,
+        "occurred_at": _occurred_at(event),
+    }
+
+
+async def apply_order_events(db: AsyncSession, events: List[Dict[str, Any]]) -> int:
+    """Applique un lot d'événements order.* à la projection, sans double comptage
+
+    Les event_id déjà connus sont ignorés : un événement redélivré ne compte qu'une
+    fois. Retourne le nombre d'événements effectivement appliqués.
+    """
+    now = datetime.now(timezone.utc)
+    rows = {}
+    for event in events:
+        row = order_event_row(event)
+        if row is not None:
+            rows[row["event_id"]] = {**row, "recorded_at": now}
+    if not rows:
+        return 0
+
+    inserted = await db.execute(
+        dialect_insert(db, OrderEventModel)
+        .values(list(rows.values()))
+        .on_conflict_do_nothing(index_elements=["event_id"])
+        .returning(OrderEventModel.event_id)
+    )
+    new_ids = set(inserted.scalars().all())
+
+    deltas: Dict[int, Dict[str, Any]] = {}
+    for event_id in new_ids:
+        row = rows[event_id]
+        delta = deltas.setdefault(
+            row["customer_id"],
+            {
+                "customer_id": row["customer_id"],
+                "order_count": 0,
+                "cancelled_count": 0,
+                "last_order_at": None,
+                "updated_at": now,
+            },
+        )
+        if row["event_type"] == ORDER_CREATED:
+            delta["order_count"] += 1
+            if (
+                delta["last_order_at"] is None
+                or row["occurred_at"] > delta["last_order_at"]
+            ):
+                delta["last_order_at"] = row["occurred_at"]
+        elif row["event_type"] == ORDER_CANCELLED:
+            delta["cancelled_count"] += 1
+
+    if deltas:
+        stats = CustomerOrderStatsModel.__table__
+        statement = dialect_insert(db, CustomerOrderStatsModel).values(
+            list(deltas.values())
+        )
+        excluded = statement.excluded
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["customer_id"],
+                set_={
+                    "order_count": stats.c.order_count + excluded.order_count,
+                    "cancelled_count": stats.c.cancelled_count
+                    + excluded.cancelled_count,
+                    "last_order_at": case(
+                        (
+                            stats.c.last_order_at.is_(None)
+                            | (excluded.last_order_at > stats.c.last_order_at),
+                            excluded.last_order_at,
+                        ),
+                        else_=stats.c.last_order_at,
+                    ),
+                    "updated_at": excluded.updated_at,
+                },
+            )
+        )
+
+    return len(new_ids)
+
+
+class OrderStatsProjector:
+    """Regroupe les événements reçus en parallèle pour des upserts par lots
+
+    Si l'upsert d'un lot échoue, ses événements sont rejoués un par un : seul
+    l'événement fautif part en retry.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = ORDER_STATS_BATCH_SIZE,
+        flush_interval: float = ORDER_STATS_FLUSH_INTERVAL,
+        retention_hours: float = ORDER_EVENTS_RETENTION_HOURS,
+    ):
+        self.session_factory = session_factory
+        self.retention = timedelta(hours=retention_hours)
+        self._last_purge = datetime.min.replace(tzinfo=timezone.utc)
+        self._batcher = Batcher(
+            self._flush, batch_size, flush_interval, isolate_failures=True
+        )
+
+    async def submit(self, event: Dict[str, Any]):
+        """Ajoute un événement au lot courant et attend qu'il soit enregistré
+
+        Un événement invalide est refusé ici, sans faire échouer le reste du lot.
+        """
+        if order_event_row(event) is None:
+            return
+        # Le message n'est acquitté qu'une fois l'événement enregistré
+        await self._batcher.submit(event)
+
+    async def _flush(self, events: List[Dict[str, Any]]):
+        async with self.session_factory() as db:
+            await apply_order_events(db, events)
+            await self._purge_expired(db)
+            await db.commit()
+
+    async def _purge_expired(self, db: AsyncSession):
+        """Oublie régulièrement les event_id enregistrés depuis plus que la rétention"""
+        now = datetime.now(timezone.utc)
+        if now - self._last_purge < timedelta(minutes=1):
+            return
+        self._last_purge = now
+        await db.execute(
+            delete(OrderEventModel).where(
+                OrderEventModel.recorded_at < now - self.retention
+            )
+        )
+
+
+order_stats_projector = OrderStatsProjector()
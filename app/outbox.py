@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import AsyncSessionLocal
+from app.messaging.coalescer import coalesce
+from app.models import OutboxEventModel
+from app.timing import timed
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+# Fenêtre de regroupement des customer.updated d'un même client (0 : désactivé)
+OUTBOX_COALESCE_WINDOW = float(os.getenv("OUTBOX_COALESCE_WINDOW", "0"))
+# Verrou consultatif PostgreSQL désignant le seul relais actif parmi les réplicas
+OUTBOX_LOCK_KEY = int(os.getenv("OUTBOX_LOCK_KEY", "7217001"))
+
+OUTBOX_EVENTS_COALESCED = Counter(
+    "outbox_events_coalesced_total",
+    "Événements de l'outbox couverts par un autre sans être publiés",
+)
+
+
+def enqueue_event(db: AsyncSession, event_type: str, data: Dict[str, Any]):
+    """Ajoute un événement à l'outbox, dans la transaction en cours de la session"""
+    with timed("outbox"):
+        event = OutboxEventModel(
+            event_id=str(uuid.uuid4()),
+            event_type=event_type,
+            payload=data,
+            created_at=datetime.now(timezone.utc),
+        )
+        db.add(event)
+    return event
+
+
+async def enqueue_events(db: AsyncSession, events: List[Tuple[str, Dict[str, Any]]]):
+    """Ajoute un lot d'événements (type, données) à l'outbox en un seul INSERT"""
+    if not events:
+        return
+    with timed("outbox"):
+        now = datetime.now(timezone.utc)
+        await db.execute(
+            insert(OutboxEventModel),
+            [
+                {
+                    "event_id": str(uuid.uuid4()),
+                    "event_type": event_type,
+                    "payload": data,
+                    "attempts": 0,
+                    "created_at": now,
+                }
+                for event_type, data in events
+            ],
+        )
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite renvoie des dates naïves, stockées en UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class OutboxRelay:
+    """Tâche de fond qui publie les événements de l'outbox par lots
+
+    Chaque réplica lance son relais, mais un seul publie à la fois : des lots
+    publiés en parallèle pourraient faire passer le customer.updated d'un client
+    avant son customer.created.
+    """
+
+    def __init__(
+        self,
+        broker,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        retention_hours: float = OUTBOX_RETENTION_HOURS,
+        coalesce_window: float = OUTBOX_COALESCE_WINDOW,
+    ):
+        self.broker = broker
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = timedelta(hours=retention_hours)
+        self.coalesce_window = coalesce_window
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = datetime.min.replace(tzinfo=timezone.utc)
+
+    def notify(self):
+        """Réveille le relais après un commit, sans attendre le prochain poll"""
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                published = await self.drain_once()
+                await self._purge_sent()
+            except Exception as e:
+                logger.exception("Outbox relay error: %s", e)
+                published = 0
+
+            # Un lot plein signifie qu'il reste probablement des événements en attente
+            if published >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Publie un lot d'événements en attente et retourne le nombre envoyé"""
+        if not self.broker or not self.broker.is_connected:
+            return 0
+
+        async with self.session_factory() as db:
+            if not await self._acquire_leadership(db):
+                return 0
+
+            result = await db.scalars(
+                select(OutboxEventModel)
+                .where(OutboxEventModel.sent_at.is_(None))
+                .order_by(OutboxEventModel.id)
+                .limit(self.batch_size)
+                .with_for_update()
+            )
+            events = result.all()
+            if not events:
+                return 0
+
+            pending = [
+                {
+                    "event_type": event.event_type,
+                    "data": event.payload,
+                    "event_id": event.event_id,
+                    "timestamp": _utc(event.created_at),
+                }
+                for event in events
+            ]
+            if self.coalesce_window > 0:
+                publish, _ = coalesce(
+                    pending, datetime.now(timezone.utc), self.coalesce_window
+                )
+            else:
+                publish = [(item, [item["event_id"]]) for item in pending]
+            if not publish:
+                return 0
+
+            results = await self.broker.publish_events([item for item, _ in publish])
+
+            by_event_id = {event.event_id: event for event in events}
+            sent_ids = []
+            for (item, covered), error in zip(publish, results):
+                if error is not None:
+                    # On s'arrête au premier échec pour conserver l'ordre des événements
+                    logger.warning(
+                        "Outbox publish failed for %s: %s", item["event_id"], error
+                    )
+                    by_event_id[item["event_id"]].attempts += 1
+                    break
+                sent_ids.extend(by_event_id[event_id].id for event_id in covered)
+                if len(covered) > 1:
+                    OUTBOX_EVENTS_COALESCED.inc(len(covered) - 1)
+
+            if sent_ids:
+                await db.execute(
+                    update(OutboxEventModel)
+                    .where(OutboxEventModel.id.in_(sent_ids))
+                    .values(sent_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+            return len(sent_ids)
+
+    @staticmethod
+    async def _acquire_leadership(db: AsyncSession) -> bool:
+        """Prend le verrou du relais pour la transaction, sans attendre
+
+        Sous SQLite, les écritures sont déjà sérialisées : pas de verrou à prendre.
+        """
+        if db.bind.dialect.name != "postgresql":
+            return True
+        return await db.scalar(select(func.pg_try_advisory_xact_lock(OUTBOX_LOCK_KEY)))
+
+    async def _purge_sent(self):
+        """Supprime régulièrement les événements déjà publiés et trop anciens"""
+        now = datetime.now(timezone.utc)
+        if now - self._last_purge < timedelta(minutes=1):
+            return
+        self._last_purge = now
+
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(OutboxEventModel).where(
+                    OutboxEventModel.sent_at.is_not(None),
+                    OutboxEventModel.sent_at < now - self.retention,
+                )
+            )
+            await db.commit()
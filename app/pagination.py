@@ -0,0 +1,58 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+
+def _encode(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _decode(token: str) -> dict:
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode la position de pagination dans un curseur opaque"""
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Décode un curseur opaque, lève une 400 s'il est invalide"""
+    if not cursor:
+        return None
+    try:
+        payload = _decode(cursor)
+        last_id = payload["id"]
+        if not isinstance(last_id, int):
+            raise ValueError("id must be an integer")
+        return last_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def encode_watermark(timestamp: datetime, last_id: int) -> str:
+    """Encode une position (updated_at, id) du flux de changements"""
+    return _encode({"ts": timestamp.isoformat(), "id": last_id})
+
+
+def decode_watermark(watermark: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Décode un watermark opaque, lève une 400 s'il est invalide"""
+    if not watermark:
+        return None
+    try:
+        payload = _decode(watermark)
+        last_id = payload["id"]
+        if not isinstance(last_id, int):
+            raise ValueError("id must be an integer")
+        return datetime.fromisoformat(payload["ts"]), last_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Watermark invalide")
@@ -0,0 +1,114 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Set, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.batching import Batcher
+from app.cache import InMemoryCache
+from app.db import AsyncSessionLocal, dialect_insert
+from app.models import ProcessedEventModel
+
+PROCESSED_EVENTS_CACHE_SIZE = int(os.getenv("PROCESSED_EVENTS_CACHE_SIZE", "100000"))
+PROCESSED_EVENTS_RETENTION_HOURS = float(
+    os.getenv("PROCESSED_EVENTS_RETENTION_HOURS", "168")
+)
+PROCESSED_EVENTS_BATCH_SIZE = int(os.getenv("PROCESSED_EVENTS_BATCH_SIZE", "200"))
+PROCESSED_EVENTS_FLUSH_INTERVAL = float(
+    os.getenv("PROCESSED_EVENTS_FLUSH_INTERVAL", "0.05")
+)
+
+
+class ProcessedEvents:
+    """Registre des event_id déjà traités par le consumer
+
+    Les event_id récents sont gardés dans un LRU borné : une redélivrance proche
+    (reconnexion, retry) est écartée sans requête SQL. La table processed_events
+    couvre les redémarrages et les autres réplicas, pendant la durée de rétention.
+    Les lectures et les écritures des messages traités en parallèle sont groupées
+    en une requête par lot.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        cache_size: int = PROCESSED_EVENTS_CACHE_SIZE,
+        retention_hours: float = PROCESSED_EVENTS_RETENTION_HOURS,
+        batch_size: int = PROCESSED_EVENTS_BATCH_SIZE,
+        flush_interval: float = PROCESSED_EVENTS_FLUSH_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.retention = timedelta(hours=retention_hours)
+        self.recent = InMemoryCache(max_size=cache_size, ttl=retention_hours * 3600)
+        self._lookups = Batcher(self._lookup_batch, batch_size, flush_interval)
+        self._records = Batcher(self._record_batch, batch_size, flush_interval)
+        self._last_purge = datetime.min.replace(tzinfo=timezone.utc)
+        self.stats = {
+            "memory_hits": 0,
+            "database_hits": 0,
+            "recorded": 0,
+            "batches": 0,
+        }
+
+    async def seen(self, event_id: str) -> bool:
+        """Indique si l'événement a déjà été traité avec succès"""
+        if await self.recent.get(event_id):
+            self.stats["memory_hits"] += 1
+            return True
+        if not await self._lookups.submit(event_id):
+            return False
+        self.stats["database_hits"] += 1
+        await self.recent.set(event_id, True)
+        return True
+
+    async def record(self, event_id: str, event_type: str):
+        """Enregistre un événement traité ; un event_id déjà connu est ignoré"""
+        await self._records.submit((event_id, event_type))
+        self.stats["recorded"] += 1
+        await self.recent.set(event_id, True)
+
+    async def _lookup_batch(self, event_ids: List[str]) -> List[bool]:
+        async with self.session_factory() as db:
+            found: Set[str] = set(
+                await db.scalars(
+                    select(ProcessedEventModel.event_id).where(
+                        ProcessedEventModel.event_id.in_(set(event_ids))
+                    )
+                )
+            )
+        self.stats["batches"] += 1
+        return [event_id in found for event_id in event_ids]
+
+    async def _record_batch(self, items: List[Tuple[str, str]]):
+        now = datetime.now(timezone.utc)
+        rows = {
+            event_id: {
+                "event_id": event_id,
+                "event_type": event_type,
+                "processed_at": now,
+            }
+            for event_id, event_type in items
+        }
+        async with self.session_factory() as db:
+            await db.execute(
+                dialect_insert(db, ProcessedEventModel)
+                .values(list(rows.values()))
+                .on_conflict_do_nothing(index_elements=["event_id"])
+            )
+            await self._purge_expired(db, now)
+            await db.commit()
+        self.stats["batches"] += 1
+
+    async def _purge_expired(self, db: AsyncSession, now: datetime):
+        if now - self._last_purge < timedelta(minutes=1):
+            return
+        self._last_purge = now
+        await db.execute(
+            delete(ProcessedEventModel).where(
+                ProcessedEventModel.processed_at < now - self.retention
+            )
+        )
+
+
+processed_events = ProcessedEvents()
@@ -1,15 +1,94 @@
+import logging
 import os
-from typing import List
-from datetime import datetime, timezone
-from fastapi import HTTPException, Depends, Security, APIRouter, Request
+from typing import Any, Dict, List, Optional
+from fastapi import (
+    HTTPException,
+    Depends,
+    Header,
+    Security,
+    APIRouter,
+    Request,
+    Response,
+    Query,
+)
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-
-from app.db import get_db
-from app.schemas import Client, ClientUpdate
-from app.models import ClientModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import CACHE_REPLICA_TTL, client_cache
+from app.conditional import (
+    client_etag,
+    has_conditional_headers,
+    if_match_versions,
+    is_not_modified,
+    page_etag,
+    validator_headers,
+)
+from app.db import (
+    get_async_db,
+    get_read_db,
+    is_primary,
+    pin_reads_to_primary,
+    reads_pinned,
+)
+from app.schemas import (
+    BulkResult,
+    Client,
+    ClientBulkDelete,
+    ClientChangePage,
+    ClientPage,
+    ClientUpdate,
+    ClientWithStats,
+    CustomerOrderStats,
+    ImportResult,
+)
+from app.changes import fetch_changes, transaction_now
+from app.bulk import (
+    BULK_CHUNK_SIZE,
+    BULK_MAX_ITEMS,
+    CLIENT_FIELDS,
+    bulk_create,
+    bulk_delete,
+    bulk_update,
+    client_event_data,
+    summarize,
+)
+from app.filters import client_filters
+from app.serialization import (
+    client_fields,
+    client_record,
+    fields_variant,
+    load_client_record,
+    project,
+    selected_columns,
+)
+from app.export import EXPORTERS, EXPORT_MEDIA_TYPES
+from app.importer import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, import_clients
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    encode_cursor,
+    decode_cursor,
+    encode_watermark,
+    decode_watermark,
+)
+from app.models import ClientModel, CustomerOrderStatsModel
+from app.idempotency import (
+    claim_key,
+    replay_cache,
+    request_fingerprint,
+    single_flight,
+    store_response,
+)
+from app.outbox import enqueue_event
+from app.writes import delete_client_returning, update_client_returning
 from app.messaging.events import CUSTOMER_CREATED, CUSTOMER_UPDATED, CUSTOMER_DELETED
 
+logger = logging.getLogger(__name__)
+
+IMPORT_PROGRESS_FIELDS = ("processed", "created", "updated", "rejected")
+
 API_TOKEN = os.getenv("API_TOKEN")
 security = HTTPBearer()
 router = APIRouter()
@@ -20,19 +99,11 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Security(security))
         raise HTTPException(status_code=403, detail="Accès interdit")
 
 
-async def publish_event_safe(request: Request, event_type: str, data: dict):
-    """Publier un événement de manière sécurisée (ne pas faire échouer l'API si le broker est down)"""
-    try:
-        broker = getattr(request.app.state, "broker", None)
-        if broker and broker.is_connected:
-            await broker.publish_event(event_type, data)
-            print(f"Event published: {event_type}")
-        else:
-            print(
-                f"Warning: Message broker not available, event {event_type} not published"
-            )
-    except Exception as e:
-        print(f"Error publishing event {event_type}: {str(e)}")
+def notify_outbox_relay(request: Request):
+    """Réveille le relais de l'outbox pour publier sans attendre le prochain poll"""
+    relay = getattr(request.app.state, "outbox_relay", None)
+    if relay:
+        relay.notify()
 
 
 @router.get("/")
@@ -40,171 +111,507 @@ def read_root():
     return {"message": "API is running"}
 
 
-@router.post("/clients", response_model=Client)
+@router.post(
+    "/clients", response_model=Client, dependencies=[Depends(pin_reads_to_primary)]
+)
 async def create_client(
     client: Client,
     request: Request,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db),
     _: HTTPAuthorizationCredentials = Security(verify_token),
 ):
+    fingerprint = request_fingerprint(client.model_dump(mode="json"))
     try:
-        db_client = ClientModel(
-            **client.model_dump(exclude={"id", "created_at", "updated_at"})
-        )
-        db.add(db_client)
-        db.commit()
-        db.refresh(db_client)
+        async with single_flight(idempotency_key):
+            now = await transaction_now(db)
+            if idempotency_key is not None:
+                stored = await claim_key(db, idempotency_key, fingerprint)
+                if stored is not None:
+                    # Retry : on rejoue la réponse sans recréer le client ni l'événement
+                    await db.rollback()
+                    return JSONResponse(
+                        stored["response"],
+                        status_code=stored["status_code"],
+                        headers={"Idempotent-Replayed": "true"},
+                    )
+
+            db_client = ClientModel(
+                **client.model_dump(exclude={"id", "created_at", "updated_at"}),
+                created_at=now,
+                updated_at=now,
+            )
+            db.add(db_client)
+            await db.flush()
+
+            enqueue_event(
+                db,
+                CUSTOMER_CREATED,
+                {
+                    "customer_id": db_client.id,
+                    "name": db_client.name,
+                    "username": db_client.username,
+                    "first_name": db_client.first_name,
+                    "last_name": db_client.last_name,
+                    "postal_code": db_client.postal_code,
+                    "city": db_client.city,
+                    "profile_first_name": db_client.profile_first_name,
+                    "profile_last_name": db_client.profile_last_name,
+                    "company_name": db_client.company_name,
+                    "created_at": now.isoformat(),
+                },
+            )
 
-        await publish_event_safe(
-            request,
-            CUSTOMER_CREATED,
-            {
-                "customer_id": db_client.id,
-                "name": db_client.name,
-                "username": db_client.username,
-                "first_name": db_client.first_name,
-                "last_name": db_client.last_name,
-                "postal_code": db_client.postal_code,
-                "city": db_client.city,
-                "profile_first_name": db_client.profile_first_name,
-                "profile_last_name": db_client.profile_last_name,
-                "company_name": db_client.company_name,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-            },
-        )
+            body = Client.model_validate(db_client).model_dump(mode="json")
+            if idempotency_key is not None:
+                stored = await store_response(
+                    db, idempotency_key, fingerprint, 200, body
+                )
+            await db.commit()
+            if idempotency_key is not None:
+                await replay_cache.set(idempotency_key, stored)
 
-        return db_client
+        notify_outbox_relay(request)
+        return body
 
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
-        print(f"Error creating client: {str(e)}")
+        await db.rollback()
+        logger.exception("Error creating client: %s", e)
         raise HTTPException(
             status_code=500, detail="Erreur lors de la création du client"
         )
 
 
-@router.get("/clients", response_model=List[Client])
-def list_clients(
-    db: Session = Depends(get_db),
+def check_bulk_size(items: List):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop d'éléments dans la requête (maximum {BULK_MAX_ITEMS})",
+        )
+
+
+@router.post(
+    "/clients/bulk",
+    response_model=BulkResult,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def bulk_create_clients(
+    items: List[Dict[str, Any]],
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    """Crée des clients par lots, avec un résultat par élément"""
+    check_bulk_size(items)
+    results = await bulk_create(db, items, chunk_size)
+    notify_outbox_relay(request)
+    return summarize(results)
+
+
+@router.patch(
+    "/clients/bulk",
+    response_model=BulkResult,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def bulk_update_clients(
+    items: List[Dict[str, Any]],
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
     _: HTTPAuthorizationCredentials = Security(verify_token),
 ):
-    return db.query(ClientModel).all()
+    """Met à jour des clients par lots ; chaque élément contient l'id et les champs modifiés"""
+    check_bulk_size(items)
+    results, updated_ids = await bulk_update(db, items, chunk_size)
+    for client_id in updated_ids:
+        await client_cache.invalidate(client_id)
+    notify_outbox_relay(request)
+    return summarize(results)
+
+
+@router.delete(
+    "/clients/bulk",
+    response_model=BulkResult,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def bulk_delete_clients(
+    payload: ClientBulkDelete,
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    """Supprime des clients par lots"""
+    check_bulk_size(payload.ids)
+    results = await bulk_delete(db, payload.ids, chunk_size)
+    for result in results:
+        if result["status"] == "deleted":
+            await client_cache.invalidate(result["id"])
+    notify_outbox_relay(request)
+    return summarize(results)
+
+
+@router.post(
+    "/clients/import",
+    response_model=ImportResult,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def import_clients_file(
+    request: Request,
+    format: Optional[str] = Query(
+        None,
+        pattern="^(ndjson|csv)$",
+        description="Par défaut, déduit du Content-Type",
+    ),
+    upsert: bool = Query(
+        False, description="Met à jour les clients dont le username existe déjà"
+    ),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    """Importe un fichier CSV ou NDJSON envoyé en corps de requête, lu en flux"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    format = format or IMPORT_FORMATS.get(content_type)
+    if format is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Format d'import non supporté (text/csv ou application/x-ndjson)",
+        )
 
+    def log_progress(summary: Dict[str, Any]):
+        logger.info(
+            "Import progress",
+            extra={"progress": {key: summary[key] for key in IMPORT_PROGRESS_FIELDS}},
+        )
 
-@router.get("/clients/{client_id}", response_model=Client)
-def get_client(
-    client_id: int,
-    db: Session = Depends(get_db),
+    summary, updated_ids = await import_clients(
+        db,
+        request.stream(),
+        format,
+        upsert=upsert,
+        chunk_size=chunk_size,
+        on_progress=log_progress,
+    )
+    for client_id in updated_ids:
+        await client_cache.invalidate(client_id)
+    notify_outbox_relay(request)
+    return summary
+
+
+@router.get("/clients", response_model=ClientPage)
+async def list_clients(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    filters: List = Depends(client_filters),
+    fields: Optional[List[str]] = Depends(client_fields),
+    db: AsyncSession = Depends(get_read_db),
     _: HTTPAuthorizationCredentials = Security(verify_token),
 ):
-    client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
-    if not client:
-        raise HTTPException(status_code=404, detail="Client non trouvé")
-    return client
+    """Liste les clients par pages, en pagination par curseur sur l'id"""
+    last_id = decode_cursor(cursor)
+    variant = fields_variant(fields)
+
+    def page_query(*columns):
+        query = select(*columns).where(*filters)
+        if last_id is not None:
+            query = query.where(ClientModel.id > last_id)
+        # On lit une ligne de plus pour savoir s'il existe une page suivante
+        return query.order_by(ClientModel.id).limit(limit + 1)
+
+    if has_conditional_headers(request):
+        # Validation sur (id, updated_at) seulement, sans charger les lignes complètes
+        versions = (
+            await db.execute(page_query(ClientModel.id, ClientModel.updated_at))
+        ).all()
+        page = versions[:limit]
+        etag = page_etag(page, len(versions) > limit, variant)
+        last_modified = max((row.updated_at for row in page), default=None)
+        if is_not_modified(request, etag, last_modified):
+            return Response(
+                status_code=304, headers=validator_headers(etag, last_modified)
+            )
 
+    # Colonnes lues en Core, sans entités ORM ni revalidation du modèle de réponse
+    result = await db.execute(page_query(*selected_columns(fields)))
+    rows = result.all()
+    page = rows[:limit]
+    has_more = len(rows) > limit
+    next_cursor = encode_cursor(page[-1].id) if has_more else None
 
-@router.put("/clients/{client_id}", response_model=Client)
-async def update_client(
+    last_modified = max((row.updated_at for row in page), default=None)
+    etag = page_etag(((row.id, row.updated_at) for row in page), has_more, variant)
+
+    return ORJSONResponse(
+        {
+            "items": [client_record(row._mapping, fields) for row in page],
+            "next_cursor": next_cursor,
+        },
+        headers=validator_headers(etag, last_modified),
+    )
+
+
+@router.get("/clients/export")
+async def export_clients(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    """Exporte tous les clients en flux NDJSON ou CSV, lot par lot"""
+    return StreamingResponse(
+        EXPORTERS[format](pinned=reads_pinned(request)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="clients.{format}"'},
+    )
+
+
+@router.get("/clients/changes", response_model=ClientChangePage)
+async def list_client_changes(
+    since: Optional[str] = Query(
+        None, description="Watermark renvoyé par l'appel précédent"
+    ),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    """Changements (créations, modifications, suppressions) depuis un watermark"""
+    watermark = decode_watermark(since)
+    items, has_more = await fetch_changes(db, watermark, limit)
+    next_watermark = (
+        encode_watermark(items[-1]["changed_at"], items[-1]["id"]) if items else since
+    )
+    return {"items": items, "next_watermark": next_watermark, "has_more": has_more}
+
+
+async def load_order_stats(db: AsyncSession, client_id: int) -> dict:
+    stats = await db.get(CustomerOrderStatsModel, client_id)
+    if stats is None:
+        return CustomerOrderStats(customer_id=client_id).model_dump(mode="json")
+    return CustomerOrderStats.model_validate(stats).model_dump(mode="json")
+
+
+@router.get("/clients/{client_id}", response_model=ClientWithStats)
+async def get_client(
     client_id: int,
-    updated_client: ClientUpdate,
     request: Request,
-    db: Session = Depends(get_db),
+    include: Optional[str] = Query(
+        None, pattern="^stats$", description="stats : inclut les statistiques"
+    ),
+    fields: Optional[List[str]] = Depends(client_fields),
+    db: AsyncSession = Depends(get_read_db),
     _: HTTPAuthorizationCredentials = Security(verify_token),
 ):
-    try:
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
-        if not client:
+    # Juste après une écriture, le cache peut encore tenir une ligne lue sur le réplica
+    pinned = reads_pinned(request)
+    client = None if pinned else await client_cache.peek(client_id)
+
+    if include == "stats":
+        # Le corps dépend aussi des statistiques : pas de validation conditionnelle
+        if client is None:
+            client = await load_client_record(db, client_id)
+            if client is None:
+                raise HTTPException(status_code=404, detail="Client non trouvé")
+        return ORJSONResponse(
+            {
+                **project(client, fields),
+                "order_stats": await load_order_stats(db, client_id),
+            }
+        )
+
+    variant = fields_variant(fields)
+
+    if client is None and has_conditional_headers(request):
+        # Vérification légère (id, updated_at) avant de matérialiser le client
+        version = (
+            await db.execute(
+                select(ClientModel.id, ClientModel.updated_at).where(
+                    ClientModel.id == client_id
+                )
+            )
+        ).first()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Client non trouvé")
+        etag = client_etag(version.id, version.updated_at, variant)
+        if is_not_modified(request, etag, version.updated_at):
+            return Response(
+                status_code=304,
+                headers=validator_headers(etag, version.updated_at),
+            )
+
+    if client is None:
+        if pinned:
+            client = await load_client_record(db, client_id)
+        else:
+            # Une ligne lue sur le réplica peut être en retard : elle n'est gardée
+            # que CACHE_REPLICA_TTL secondes
+            client = await client_cache.get_or_load(
+                client_id,
+                lambda: load_client_record(db, client_id),
+                None if is_primary(db) else CACHE_REPLICA_TTL,
+            )
+        if client is None:
+            raise HTTPException(status_code=404, detail="Client non trouvé")
+
+    etag = client_etag(client["id"], client["updated_at"], variant)
+    headers = validator_headers(etag, client["updated_at"])
+    if is_not_modified(request, etag, client["updated_at"]):
+        return Response(status_code=304, headers=headers)
+
+    # Le cache contient déjà le JSON du client : pas de nouvelle validation
+    return ORJSONResponse(project(client, fields), headers=headers)
+
+
+@router.get("/clients/{client_id}/stats", response_model=CustomerOrderStats)
+async def get_client_stats(
+    client_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    """Statistiques de commandes du client, lues dans la projection locale"""
+    stats = await db.get(CustomerOrderStatsModel, client_id)
+    if stats is None:
+        exists = await db.scalar(
+            select(ClientModel.id).where(ClientModel.id == client_id)
+        )
+        if exists is None:
             raise HTTPException(status_code=404, detail="Client non trouvé")
+        return CustomerOrderStats(customer_id=client_id)
+    return stats
+
+
+async def raise_missing_or_modified(db: AsyncSession, client_id: int):
+    """Explique une écriture qui n'a touché aucune ligne : 404 ou 412 (If-Match)"""
+    exists = await db.scalar(select(ClientModel.id).where(ClientModel.id == client_id))
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Client non trouvé")
+    raise HTTPException(status_code=412, detail="Le client a été modifié entre-temps")
+
 
-        old_values = {
-            "name": client.name,
-            "username": client.username,
-            "first_name": client.first_name,
-            "last_name": client.last_name,
-            "postal_code": client.postal_code,
-            "city": client.city,
-            "profile_first_name": client.profile_first_name,
-            "profile_last_name": client.profile_last_name,
-            "company_name": client.company_name,
-        }
-
-        changes = updated_client.model_dump(exclude_unset=True)
-        for field, value in changes.items():
-            setattr(client, field, value)
-
-        db.commit()
-        db.refresh(client)
-
-        await publish_event_safe(
-            request,
+async def apply_client_update(
+    client_id: int,
+    changes: Dict[str, Any],
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+) -> Dict[str, Any]:
+    """Écrit les changements en un UPDATE ... RETURNING et publie customer.updated"""
+    try:
+        now = await transaction_now(db)
+        updated = await update_client_returning(
+            db, client_id, changes, now, if_match_versions(request, client_id)
+        )
+        if updated is None:
+            await raise_missing_or_modified(db, client_id)
+        values, old_values = updated
+
+        enqueue_event(
+            db,
             CUSTOMER_UPDATED,
-            {
-                "customer_id": client.id,
-                "name": client.name,
-                "username": client.username,
-                "first_name": client.first_name,
-                "last_name": client.last_name,
-                "postal_code": client.postal_code,
-                "city": client.city,
-                "profile_first_name": client.profile_first_name,
-                "profile_last_name": client.profile_last_name,
-                "company_name": client.company_name,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-                "changes": changes,
-                "old_values": old_values,
-            },
+            client_event_data(
+                client_id,
+                values,
+                updated_at=now.isoformat(),
+                changes=changes,
+                old_values={field: old_values[field] for field in CLIENT_FIELDS},
+            ),
         )
 
-        return client
+        await db.commit()
+        await client_cache.invalidate(client_id)
+        notify_outbox_relay(request)
+
+        etag = client_etag(client_id, values["updated_at"])
+        response.headers.update(validator_headers(etag, values["updated_at"]))
+        return values
 
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"Error updating client: {str(e)}")
+        await db.rollback()
+        logger.exception("Error updating client: %s", e)
         raise HTTPException(
             status_code=500, detail="Erreur lors de la mise à jour du client"
         )
 
 
-@router.delete("/clients/{client_id}", response_model=dict)
+@router.put(
+    "/clients/{client_id}",
+    response_model=Client,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def update_client(
+    client_id: int,
+    updated_client: ClientUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    changes = updated_client.model_dump(exclude_unset=True)
+    return await apply_client_update(client_id, changes, request, response, db)
+
+
+@router.patch(
+    "/clients/{client_id}",
+    response_model=Client,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def patch_client(
+    client_id: int,
+    updated_client: ClientUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    _: HTTPAuthorizationCredentials = Security(verify_token),
+):
+    """Modifie uniquement les champs fournis ; If-Match active le contrôle de version"""
+    changes = updated_client.model_dump(exclude_unset=True)
+    return await apply_client_update(client_id, changes, request, response, db)
+
+
+@router.delete(
+    "/clients/{client_id}",
+    response_model=dict,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def delete_client(
     client_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _: HTTPAuthorizationCredentials = Security(verify_token),
 ):
     try:
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
-        if not client:
-            raise HTTPException(status_code=404, detail="Client non trouvé")
-
-        client_data = {
-            "customer_id": client.id,
-            "name": client.name,
-            "username": client.username,
-            "first_name": client.first_name,
-            "last_name": client.last_name,
-            "postal_code": client.postal_code,
-            "city": client.city,
-            "profile_first_name": client.profile_first_name,
-            "profile_last_name": client.profile_last_name,
-            "company_name": client.company_name,
-            "deleted_at": datetime.now(timezone.utc).isoformat(),
-        }
-
-        db.delete(client)
-        db.commit()
-
-        await publish_event_safe(request, CUSTOMER_DELETED, client_data)
+        now = await transaction_now(db)
+        deleted = await delete_client_returning(
+            db, client_id, now, if_match_versions(request, client_id)
+        )
+        if deleted is None:
+            await raise_missing_or_modified(db, client_id)
+
+        enqueue_event(
+            db,
+            CUSTOMER_DELETED,
+            client_event_data(
+                client_id,
+                deleted,
+                deleted_at=now.isoformat(),
+            ),
+        )
+        await db.commit()
+        await client_cache.invalidate(client_id)
+        notify_outbox_relay(request)
 
         return {"message": "Client supprimé avec succès"}
 
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"Error deleting client: {str(e)}")
+        await db.rollback()
+        logger.exception("Error deleting client: %s", e)
         raise HTTPException(
             status_code=500, detail="Erreur lors de la suppression du client"
         )
@@ -215,17 +622,22 @@ async def check_messaging_health(request: Request):
     """Vérifier l'état de la connexion au message broker"""
     try:
         broker = getattr(request.app.state, "broker", None)
+        consumer = getattr(request.app.state, "consumer", None)
         if broker and broker.is_connected:
             return {
                 "status": "healthy",
                 "message_broker": "connected",
                 "service": broker.service_name,
+                "publisher": broker.publisher_stats(),
+                "consumer": consumer.consumer_stats() if consumer else None,
             }
         else:
+            supervisor = getattr(request.app.state, "broker_supervisor", None)
             return {
                 "status": "warning",
                 "message_broker": "disconnected",
                 "message": "API fonctionne mais les événements ne sont pas publiés",
+                "connection": supervisor.stats() if supervisor else None,
             }
     except Exception as e:
         return {"status": "error", "message_broker": "error", "error": str(e)}
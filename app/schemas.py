@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel, ConfigDict
+from typing import Any, List, Optional
+from pydantic import BaseModel, ConfigDict, field_validator
 from datetime import datetime
 
 
@@ -34,8 +34,84 @@ class ClientUpdate(BaseModel):
     profile_last_name: Optional[str] = None
     company_name: Optional[str] = None
 
+    @field_validator("name")
+    @classmethod
+    def name_not_null(cls, value: Optional[str]) -> str:
+        # name peut être omis, mais pas effacé : la colonne est NOT NULL
+        if value is None:
+            raise ValueError("name ne peut pas être null")
+        return value
+
 
 class Client(ClientBase):
     id: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+
+
+class CustomerOrderStats(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    customer_id: int
+    order_count: int = 0
+    cancelled_count: int = 0
+    last_order_at: Optional[datetime] = None
+
+
+class ClientWithStats(Client):
+    order_stats: Optional[CustomerOrderStats] = None
+
+
+class ClientPage(BaseModel):
+    items: List[Client]
+    next_cursor: Optional[str] = None
+
+
+class ClientChange(BaseModel):
+    op: str
+    id: int
+    changed_at: datetime
+    client: Optional[Client] = None
+
+
+class ClientChangePage(BaseModel):
+    items: List[ClientChange]
+    next_watermark: Optional[str] = None
+    has_more: bool = False
+
+
+class ClientBulkUpdate(ClientUpdate):
+    id: int
+
+
+class ClientBulkDelete(BaseModel):
+    ids: List[int]
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    error: Optional[Any] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class ImportRejectedRow(BaseModel):
+    row: int
+    errors: Any
+
+
+class ImportResult(BaseModel):
+    processed: int
+    created: int
+    updated: int
+    unchanged: int
+    superseded: int
+    rejected: int
+    rejected_rows: List[ImportRejectedRow]
+    duration_ms: float
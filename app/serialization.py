@@ -0,0 +1,87 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ClientModel
+
+clients_columns = ClientModel.__table__.c
+CLIENT_COLUMNS = [column.name for column in ClientModel.__table__.columns]
+
+
+def client_fields(
+    fields: Optional[str] = Query(
+        None,
+        description="Champs à renvoyer, séparés par des virgules (id toujours inclus)",
+        examples=["id,name,company_name"],
+    ),
+) -> Optional[List[str]]:
+    """Champs demandés par ?fields=, dans l'ordre des colonnes ; None pour tous"""
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(CLIENT_COLUMNS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Champs inconnus : {', '.join(sorted(unknown))}",
+        )
+    requested.add("id")
+    return [name for name in CLIENT_COLUMNS if name in requested]
+
+
+def fields_variant(fields: Optional[List[str]]) -> Optional[str]:
+    """Suffixe d'ETag : deux projections d'une même ligne sont deux représentations"""
+    if fields is None:
+        return None
+    return hashlib.sha1(",".join(fields).encode("ascii")).hexdigest()[:8]
+
+
+def selected_columns(fields: Optional[List[str]]) -> list:
+    """Colonnes à lire : celles demandées, plus id et updated_at pour les ETags"""
+    if fields is None:
+        return list(clients_columns)
+    names = set(fields) | {"id", "updated_at"}
+    return [clients_columns[name] for name in CLIENT_COLUMNS if name in names]
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # Même format que Pydantic : suffixe Z pour UTC (SQLite renvoie des dates
+        # naïves, stockées en UTC)
+        if value.tzinfo is None:
+            return value.isoformat() + "Z"
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return value
+
+
+def client_record(
+    row: Mapping[str, Any], fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Ligne lue en base vers un dictionnaire JSON, sans revalidation Pydantic
+
+    Les données viennent de notre propre table : elles respectent déjà le schéma.
+    """
+    names = CLIENT_COLUMNS if fields is None else fields
+    return {name: _json_value(row[name]) for name in names}
+
+
+def project(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return record
+    return {name: record[name] for name in fields}
+
+
+async def load_client_record(
+    db: AsyncSession, client_id: int
+) -> Optional[Dict[str, Any]]:
+    row = (
+        await db.execute(
+            select(*clients_columns).where(clients_columns.id == client_id)
+        )
+    ).first()
+    return client_record(row._mapping) if row is not None else None
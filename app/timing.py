@@ -0,0 +1,185 @@
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+TIMING_HEADER = "x-debug-timing"
+TIMING_SAMPLE_RATE = float(os.getenv("TIMING_SAMPLE_RATE", "0"))
+TIMING_SLOW_MS = float(os.getenv("TIMING_SLOW_MS", "500"))
+TIMING_SLOW_STATEMENTS = int(os.getenv("TIMING_SLOW_STATEMENTS", "5"))
+
+
+class RequestTimings:
+    """Durées cumulées par composant (db, outbox, cache...) pour une requête"""
+
+    def __init__(self, keep_statements: int = TIMING_SLOW_STATEMENTS):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+        self.keep_statements = keep_statements
+        self.statements: List[Tuple[float, str]] = []
+
+    def add(self, name: str, duration: float):
+        span = self.spans.setdefault(name, [0.0, 0])
+        span[0] += duration
+        span[1] += 1
+
+    def add_statement(self, statement: str, duration: float):
+        self.add("db", duration)
+        if self.keep_statements:
+            # On ne garde que les requêtes les plus lentes
+            self.statements.append((duration, statement))
+            if len(self.statements) > self.keep_statements:
+                self.statements.sort(reverse=True)
+                self.statements.pop()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self, total: float) -> Dict[str, Dict[str, float]]:
+        spans = {
+            name: {"ms": round(duration * 1000, 3), "count": count}
+            for name, (duration, count) in self.spans.items()
+        }
+        # Le reste : code applicatif, validation et sérialisation Pydantic
+        measured = sum(duration for duration, _ in self.spans.values())
+        spans["app"] = {"ms": round(max(total - measured, 0.0) * 1000, 3), "count": 1}
+        spans["total"] = {"ms": round(total * 1000, 3), "count": 1}
+        return spans
+
+    def server_timing(self, total: float) -> str:
+        entries = []
+        for name, span in self.breakdown(total).items():
+            entry = f"{name};dur={span['ms']}"
+            if span["count"] > 1:
+                entry += f';desc="{span["count"]} calls"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def timed(name: str):
+    """Chronomètre un bloc pour la requête en cours, sans coût si le suivi est inactif"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _current.get() is not None:
+        conn.info.setdefault("timing_start", {})[context] = time.perf_counter()
+
+
+def _record_statement(conn, context, statement):
+    started = conn.info.get("timing_start", {}).pop(context, None)
+    timings = _current.get()
+    if timings is not None and started is not None:
+        timings.add_statement(statement or "", time.perf_counter() - started)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    _record_statement(conn, context, statement)
+
+
+def _handle_error(exception_context):
+    # Une instruction en échec ne passe pas par after_cursor_execute
+    if exception_context.connection is not None:
+        _record_statement(
+            exception_context.connection,
+            exception_context.execution_context,
+            exception_context.statement,
+        )
+
+
+def install_sql_timing():
+    """Chronomètre les requêtes SQL de tous les engines pour la requête en cours"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+class TimingMiddleware:
+    """Ajoute un en-tête Server-Timing et un log structuré aux requêtes suivies
+
+    Le suivi est activé par l'en-tête X-Debug-Timing ou pour une fraction
+    TIMING_SAMPLE_RATE des requêtes. Les requêtes plus lentes que TIMING_SLOW_MS
+    journalisent aussi leurs requêtes SQL les plus lentes.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = TIMING_SAMPLE_RATE,
+        slow_ms: float = TIMING_SLOW_MS,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    def _enabled(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == TIMING_HEADER.encode() and value not in (b"", b"0"):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = {"code": 500}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", timings.server_timing(timings.elapsed())
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._log(scope, status["code"], timings)
+
+    def _log(self, scope: Scope, status: int, timings: RequestTimings):
+        total = timings.elapsed()
+        entry = {
+            "method": scope["method"],
+            "route": route_template(scope),
+            "status": status,
+            "timings": timings.breakdown(total),
+        }
+        if total * 1000 >= self.slow_ms and timings.statements:
+            entry["slowest_statements"] = [
+                {"ms": round(duration * 1000, 3), "statement": statement[:500]}
+                for duration, statement in sorted(timings.statements, reverse=True)
+            ]
+        logger.info("request_timing", extra=entry)
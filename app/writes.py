@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bulk import CLIENT_FIELDS, clients_table
+from app.changes import record_tombstones
+
+# Colonnes renvoyées avec leurs valeurs avant modification
+OLD_FIELDS = CLIENT_FIELDS + ["updated_at"]
+
+
+def _version_matches(expected_versions: Optional[List[datetime]]):
+    # Sans If-Match, aucune condition ; sinon la ligne doit être dans l'une des versions
+    if expected_versions is None:
+        return true()
+    return clients_table.c.updated_at.in_(expected_versions)
+
+
+def _split(row) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    values = dict(row._mapping)
+    old_values = {field: values.pop(f"old_{field}") for field in OLD_FIELDS}
+    return values, old_values
+
+
+async def update_client_returning(
+    db: AsyncSession,
+    client_id: int,
+    changes: Mapping[str, Any],
+    now: datetime,
+    expected_versions: Optional[List[datetime]] = None,
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Met à jour un client et renvoie (nouvelles valeurs, anciennes valeurs)
+
+    Sur PostgreSQL, un seul UPDATE ... FROM (SELECT ... FOR UPDATE) ... RETURNING lit
+    les anciennes valeurs, écrit et renvoie la ligne. SQLite n'autorise pas les tables
+    du FROM dans RETURNING : les anciennes valeurs y sont lues à part.
+    Avec `expected_versions` (If-Match), l'UPDATE ne touche la ligne que si son
+    updated_at en fait partie. Retourne None si le client n'existe pas ou n'est plus
+    dans la version attendue.
+    """
+    if db.bind.dialect.name == "postgresql":
+        old = (
+            select(clients_table)
+            .where(clients_table.c.id == client_id)
+            .with_for_update()
+            .subquery("old")
+        )
+        result = await db.execute(
+            update(clients_table)
+            .where(clients_table.c.id == old.c.id)
+            .where(_version_matches(expected_versions))
+            .values(**changes, updated_at=now)
+            .returning(
+                *clients_table.c,
+                *(old.c[field].label(f"old_{field}") for field in OLD_FIELDS),
+            )
+        )
+        row = result.first()
+        return _split(row) if row is not None else None
+
+    current = (
+        await db.execute(
+            select(*(clients_table.c[field] for field in OLD_FIELDS)).where(
+                clients_table.c.id == client_id
+            )
+        )
+    ).first()
+    if current is None:
+        return None
+    result = await db.execute(
+        update(clients_table)
+        .where(clients_table.c.id == client_id)
+        .where(_version_matches(expected_versions))
+        .values(**changes, updated_at=now)
+        .returning(*clients_table.c)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return dict(row._mapping), dict(current._mapping)
+
+
+async def delete_client_returning(
+    db: AsyncSession,
+    client_id: int,
+    now: datetime,
+    expected_versions: Optional[List[datetime]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Supprime un client par DELETE ... RETURNING, note sa tombstone et renvoie ses valeurs
+
+    Retourne None si le client n'existe pas ou n'est plus dans la version attendue.
+    """
+    result = await db.execute(
+        delete(clients_table)
+        .where(clients_table.c.id == client_id)
+        .where(_version_matches(expected_versions))
+        .returning(*clients_table.c)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    await record_tombstones(db, [client_id], now)
+    return dict(row._mapping)
@@ -0,0 +1,359 @@
+"""Benchmark local des routes CRUD et du chemin des événements
+
+Usage (SQLite par défaut, aucun service externe nécessaire) :
+
+    python -m benchmarks.crud --clients 500 --concurrency 20 --output results.json
+    python -m benchmarks.crud --output results.json --save-baseline baseline.json
+    python -m benchmarks.crud --baseline baseline.json --tolerance 0.2
+
+Les requêtes passent par l'application ASGI en mémoire (httpx, sans réseau) et
+RabbitMQ est remplacé par un broker en mémoire : les mesures couvrent l'API, la base
+et l'outbox, pas le transport. Le code de sortie vaut 1 si une opération régresse par
+rapport à la baseline (p95 ou débit au-delà de la tolérance).
+
+Le contrôle d'admission est désactivé par défaut (ADMISSION_ENABLED=false) : il
+mesurerait ses propres limites plutôt que l'API. S'il est activé, les réponses 503 sont
+comptées à part (`shed`), pas comme des erreurs.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+API_TOKEN = "benchmark-token"
+
+
+class InMemoryMessage:
+    """Message entrant minimal compatible avec les callbacks de consommation"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    @asynccontextmanager
+    async def process(self, ignore_processed=False):
+        yield
+
+    async def reject(self, requeue=False):
+        pass
+
+
+class InMemoryBroker:
+    """Remplace MessageBroker : les événements publiés sont livrés aux abonnés"""
+
+    def __init__(self, service_name: str = "customer-api"):
+        self.service_name = service_name
+        self.is_connected = True
+        self.published = 0
+        self._subscribers: List[Callable] = []
+
+    async def publish_event(self, event_type, data, event_id=None, timestamp=None):
+        body = json.dumps(
+            {
+                "event_type": event_type,
+                "event_id": event_id or str(uuid.uuid4()),
+                "timestamp": (timestamp or datetime.now(timezone.utc)).isoformat(),
+                "service": self.service_name,
+                "data": data,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        self.published += 1
+        for callback in self._subscribers:
+            await callback(InMemoryMessage(body))
+
+    async def publish_events(self, events):
+        for event in events:
+            await self.publish_event(**event)
+        return [None] * len(events)
+
+    async def subscribe_to_events(self, event_patterns, callback):
+        self._subscribers.append(callback)
+
+
+# Requête refusée par le contrôle d'admission (503), ni succès ni erreur
+SHED = object()
+
+
+def percentile(sorted_values: List[float], ratio: float) -> float:
+    """Percentile au rang le plus proche sur une liste déjà triée"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(ratio * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(
+    latencies: List[float], errors: int, shed: int, elapsed: float
+) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "shed": shed,
+        "throughput_per_second": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+    }
+
+
+async def run_phase(
+    operations: List[Callable[[], Awaitable[bool]]], concurrency: int
+) -> Dict[str, Any]:
+    """Exécute les opérations avec au plus `concurrency` en cours, chronométrées"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    shed = 0
+
+    async def timed(operation):
+        nonlocal errors, shed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await operation()
+            except Exception:
+                ok = False
+            if ok is SHED:
+                shed += 1
+            elif ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(operation) for operation in operations))
+    return summarize(latencies, errors, shed, time.perf_counter() - started)
+
+
+def client_payload(index: int) -> Dict[str, Any]:
+    return {
+        "name": f"Client {index}",
+        "username": f"bench{index}",
+        "first_name": "Prénom",
+        "last_name": f"Nom {index % 100}",
+        "postal_code": f"{75000 + index % 1000:05d}",
+        "city": f"Ville {index % 50}",
+        "company_name": f"Société {index % 200}",
+    }
+
+
+async def bench_crud(http, clients: int, concurrency: int, page_size: int):
+    headers = {"Authorization": f"Bearer {API_TOKEN}"}
+    ids: List[int] = []
+    results = {}
+
+    async def create(index):
+        response = await http.post(
+            "/clients", json=client_payload(index), headers=headers
+        )
+        if response.status_code == 503:
+            return SHED
+        if response.status_code != 200:
+            return False
+        ids.append(response.json()["id"])
+        return True
+
+    results["create_client"] = await run_phase(
+        [lambda i=i: create(i) for i in range(clients)], concurrency
+    )
+
+    async def expect(method, url, status=200, **kwargs):
+        response = await http.request(method, url, headers=headers, **kwargs)
+        if response.status_code == 503:
+            return SHED
+        return response.status_code == status
+
+    results["get_client"] = await run_phase(
+        [lambda i=i: expect("GET", f"/clients/{i}") for i in ids], concurrency
+    )
+    results["list_clients"] = await run_phase(
+        [
+            lambda i=i: expect("GET", "/clients", params={"limit": page_size})
+            for i in range(max(1, clients // 10))
+        ],
+        concurrency,
+    )
+    results["update_client"] = await run_phase(
+        [
+            lambda i=i: expect("PUT", f"/clients/{i}", json={"city": "Lyon"})
+            for i in ids
+        ],
+        concurrency,
+    )
+    results["delete_client"] = await run_phase(
+        [lambda i=i: expect("DELETE", f"/clients/{i}") for i in ids], concurrency
+    )
+    return results
+
+
+async def bench_outbox_publish(broker, batch_size: int):
+    """Vide l'outbox remplie par les écritures CRUD, lot par lot"""
+    from app.outbox import OutboxRelay
+
+    relay = OutboxRelay(broker, batch_size=batch_size)
+    latencies: List[float] = []
+    published = 0
+    started = time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        sent = await relay.drain_once()
+        if not sent:
+            break
+        published += sent
+        # Chaque événement du lot attend la fin du lot pour être marqué envoyé
+        latencies.extend([time.perf_counter() - batch_started] * sent)
+    return summarize(latencies, 0, 0, time.perf_counter() - started)
+
+
+async def bench_consume(broker, events: int, customers: int, concurrency: int):
+    """Publie des order.created et mesure jusqu'à l'enregistrement de la projection"""
+    from app.handlers import dispatcher
+    from app.messaging.consumer import ConcurrentConsumer
+
+    consumer = ConcurrentConsumer(dispatcher, concurrency=concurrency)
+    await broker.subscribe_to_events(["order.*"], consumer)
+
+    async def consume(index):
+        await broker.publish_event(
+            "order.created", {"customer_id": index % customers, "order_id": index}
+        )
+        return True
+
+    results = await run_phase(
+        [lambda i=i: consume(i) for i in range(events)], concurrency
+    )
+    results["failed"] = consumer.stats["failed"]
+    return results
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+    from sqlalchemy import delete
+
+    from app.db import AsyncSessionLocal, Base, engine
+    from app.main import app
+    from app.models import ClientModel, OutboxEventModel
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    broker = InMemoryBroker()
+    transport = httpx.ASGITransport(app=app)
+    results = {
+        "database": engine.dialect.name,
+        "clients": args.clients,
+        "concurrency": args.concurrency,
+        "operations": {},
+    }
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        results["operations"].update(
+            await bench_crud(http, args.clients, args.concurrency, args.page_size)
+        )
+
+    results["operations"]["publish_events"] = await bench_outbox_publish(
+        broker, args.outbox_batch_size
+    )
+    results["operations"]["consume_events"] = await bench_consume(
+        broker, args.events, max(1, args.clients // 5), args.concurrency
+    )
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(OutboxEventModel))
+        await db.execute(delete(ClientModel))
+        await db.commit()
+    return results
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Liste les opérations plus lentes que la baseline au-delà de la tolérance"""
+    regressions = []
+    for name, current in results["operations"].items():
+        reference = baseline.get("operations", {}).get(name)
+        if not reference:
+            continue
+        if current["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']}ms > {reference['p95_ms']}ms"
+            )
+        if current["throughput_per_second"] < reference["throughput_per_second"] * (
+            1 - tolerance
+        ):
+            regressions.append(
+                f"{name}: débit {current['throughput_per_second']}/s < "
+                f"{reference['throughput_per_second']}/s"
+            )
+        if current["errors"] > reference["errors"]:
+            regressions.append(
+                f"{name}: {current['errors']} erreurs (baseline {reference['errors']})"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("BENCH_DATABASE_URL"),
+        help="Base dédiée aux benchmarks, vidée au démarrage (SQLite temporaire par défaut)",
+    )
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--outbox-batch-size", type=int, default=100)
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    parser.add_argument("--baseline", help="Résultats de référence à comparer")
+    parser.add_argument("--save-baseline", help="Enregistre ces résultats en baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Écart relatif toléré sur le p95 et le débit (0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(
+            tempfile.mkdtemp(prefix="bench-"), "bench.db"
+        )
+
+    # La configuration de l'application est lue à l'import
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["API_TOKEN"] = API_TOKEN
+    os.environ.setdefault("CACHE_BACKEND", "memory")
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+    results = asyncio.run(run(args))
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(report)
+    print(report)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Vérifie que les filtres de GET /clients utilisent les index sur une grosse table
+
+Usage (PostgreSQL uniquement, la base est remplie de données de test) :
+
+    python -m benchmarks.filter_indexes --database-url postgresql://... --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+FILTER_CASES = {
+    "city": {"city": "Ville 42"},
+    "postal_code": {"postal_code": "75042"},
+    "company_name": {"company_name": "Société 4242"},
+    "name_prefix": {"name": "client 12345"},
+    "last_name_prefix": {"last_name": "nom 9999"},
+    "search": {"search": "t 54321"},
+}
+
+PRIMARY_KEY_INDEXES = {"clients_pkey", "ix_clients_id"}
+
+FILTER_PARAMS = ("city", "postal_code", "company_name", "name", "last_name", "search")
+
+
+def seed(connection, rows: int):
+    from sqlalchemy import text
+
+    existing = connection.execute(text("SELECT count(*) FROM clients")).scalar()
+    if existing >= rows:
+        return existing
+
+    connection.execute(
+        text("""
+            INSERT INTO clients (
+                name, username, first_name, last_name, postal_code, city,
+                company_name, created_at, updated_at
+            )
+            SELECT
+                'Client ' || g,
+                'user' || g,
+                'Prénom ' || g,
+                'Nom ' || (g % 100000),
+                lpad((75000 + g % 1000)::text, 5, '0'),
+                'Ville ' || (g % 5000),
+                'Société ' || (g % 20000),
+                now(),
+                now()
+            FROM generate_series(:start, :stop) AS g
+            """),
+        {"start": existing + 1, "stop": rows},
+    )
+    connection.execute(text("ANALYZE clients"))
+    return rows
+
+
+def _walk_plan(node: dict, node_types: set, index_names: set):
+    node_types.add(node["Node Type"])
+    if "Index Name" in node:
+        index_names.add(node["Index Name"])
+    for child in node.get("Plans", []):
+        _walk_plan(child, node_types, index_names)
+
+
+def explain(connection, filters: dict, limit: int = 100) -> dict:
+    from sqlalchemy import select
+
+    from app.filters import client_filters
+    from app.models import ClientModel
+
+    params = {name: filters.get(name) for name in FILTER_PARAMS}
+    query = (
+        select(ClientModel)
+        .where(*client_filters(**params))
+        .order_by(ClientModel.id)
+        .limit(limit)
+    )
+    compiled = query.compile(dialect=connection.dialect)
+
+    started = time.perf_counter()
+    plan = connection.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    node_types, index_names = set(), set()
+    _walk_plan(plan[0]["Plan"], node_types, index_names)
+    return {
+        # Un parcours de la clé primaire filtré ligne à ligne ne compte pas
+        "uses_index": bool(index_names - PRIMARY_KEY_INDEXES),
+        "indexes": sorted(index_names),
+        "seq_scan": "Seq Scan" in node_types,
+        "execution_ms": plan[0]["Execution Time"],
+        "roundtrip_ms": round(elapsed_ms, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("BENCH_DATABASE_URL"),
+        help="Base PostgreSQL dédiée aux benchmarks (BENCH_DATABASE_URL)",
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("--database-url ou BENCH_DATABASE_URL est requis")
+
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import create_engine
+
+    from app.db import Base
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        parser.error("ce benchmark nécessite PostgreSQL")
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        total = seed(connection, args.rows)
+
+    results = {"rows": total, "filters": {}}
+    with engine.connect() as connection:
+        for case, filters in FILTER_CASES.items():
+            results["filters"][case] = explain(connection, filters)
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    print(report)
+
+    return 0 if all(r["uses_index"] for r in results["filters"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Index et timestamptz de clients, outbox, commandes, tombstones, idempotence
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ("name", "last_name")
+TIMESTAMP_COLUMNS = ("created_at", "updated_at")
+CLIENT_INDEXES = (
+    "ix_clients_city",
+    "ix_clients_postal_code",
+    "ix_clients_company_name",
+    "ix_clients_updated_at_id",
+    "ix_clients_name_lower",
+    "ix_clients_last_name_lower",
+)
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+
+    # Horodatages en UTC explicite : les valeurs naïves existantes sont en UTC
+    with op.batch_alter_table("clients") as batch_op:
+        for column in TIMESTAMP_COLUMNS:
+            batch_op.alter_column(
+                column,
+                type_=sa.DateTime(timezone=True),
+                existing_type=sa.DateTime(),
+                existing_nullable=False,
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            )
+
+    op.create_index("ix_clients_city", "clients", ["city"])
+    op.create_index("ix_clients_postal_code", "clients", ["postal_code"])
+    op.create_index("ix_clients_company_name", "clients", ["company_name"])
+    op.create_index("ix_clients_updated_at_id", "clients", ["updated_at", "id"])
+    if is_postgresql:
+        op.execute(
+            "CREATE INDEX ix_clients_name_lower ON clients (lower(name) text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX ix_clients_last_name_lower "
+            "ON clients (lower(last_name) text_pattern_ops)"
+        )
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in TRGM_COLUMNS:
+            op.execute(
+                f"CREATE INDEX ix_clients_{column}_trgm "
+                f"ON clients USING gin (lower({column}) gin_trgm_ops)"
+            )
+    else:
+        op.create_index("ix_clients_name_lower", "clients", [sa.text("lower(name)")])
+        op.create_index(
+            "ix_clients_last_name_lower", "clients", [sa.text("lower(last_name)")]
+        )
+
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("event_id", sa.String(length=36), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("event_id"),
+    )
+    op.create_index(
+        "ix_outbox_events_pending",
+        "outbox_events",
+        ["id"],
+        postgresql_where=sa.text("sent_at IS NULL"),
+        sqlite_where=sa.text("sent_at IS NULL"),
+    )
+
+    op.create_table(
+        "customer_order_stats",
+        sa.Column("customer_id", sa.Integer(), nullable=False),
+        sa.Column("order_count", sa.Integer(), nullable=False),
+        sa.Column("cancelled_count", sa.Integer(), nullable=False),
+        sa.Column("last_order_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("customer_id"),
+    )
+
+    op.create_table(
+        "order_events",
+        sa.Column("event_id", sa.String(length=64), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("customer_id", sa.Integer(), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("event_id"),
+    )
+    op.create_index("ix_order_events_customer_id", "order_events", ["customer_id"])
+
+    op.create_table(
+        "client_tombstones",
+        sa.Column("client_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("client_id"),
+    )
+    op.create_index(
+        "ix_client_tombstones_deleted_at_id",
+        "client_tombstones",
+        ["deleted_at", "client_id"],
+    )
+
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("response", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        "ix_idempotency_keys_created_at", "idempotency_keys", ["created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("idempotency_keys")
+    op.drop_table("client_tombstones")
+    op.drop_table("order_events")
+    op.drop_table("customer_order_stats")
+    op.drop_table("outbox_events")
+    for index in CLIENT_INDEXES:
+        op.drop_index(index, table_name="clients")
+    if op.get_bind().dialect.name == "postgresql":
+        for column in TRGM_COLUMNS:
+            op.drop_index(f"ix_clients_{column}_trgm", table_name="clients")
+    # pg_trgm reste installée
+    with op.batch_alter_table("clients") as batch_op:
+        for column in TIMESTAMP_COLUMNS:
+            batch_op.alter_column(
+                column,
+                type_=sa.DateTime(),
+                existing_type=sa.DateTime(timezone=True),
+                existing_nullable=False,
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            )
@@ -0,0 +1,39 @@
+"""Date d'enregistrement des événements de commande, pour purger order_events
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "order_events",
+        sa.Column("recorded_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Les lignes existantes partent pour une durée de rétention complète
+    op.execute("UPDATE order_events SET recorded_at = CURRENT_TIMESTAMP")
+    with op.batch_alter_table("order_events") as batch_op:
+        batch_op.alter_column(
+            "recorded_at",
+            existing_type=sa.DateTime(timezone=True),
+            nullable=False,
+        )
+    op.create_index("ix_order_events_recorded_at", "order_events", ["recorded_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_events_recorded_at", table_name="order_events")
+    with op.batch_alter_table("order_events") as batch_op:
+        batch_op.drop_column("recorded_at")
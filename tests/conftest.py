@@ -1,9 +1,14 @@
+import asyncio
 import pytest
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.db import Base, get_db
+from sqlalchemy.pool import NullPool
+from app.db import Base, get_db, AsyncSessionLocal, async_engine, to_async_url
 from app.main import app
+from app.cache import client_cache
+from app.idempotency import replay_cache
 from starlette.testclient import TestClient
 
 SQLALCHEMY_DATABASE_URL = os.getenv(
@@ -30,16 +35,53 @@ def db_session(db_engine):
     session.close()
 
 
+@pytest.fixture(scope="function")
+def async_session_factory(db_engine):
+    # TestClient ouvre une boucle asyncio par requête : pas de pool partagé entre boucles
+    engine = create_async_engine(
+        to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+    )
+    AsyncSessionLocal.configure(bind=engine)
+    yield AsyncSessionLocal
+    AsyncSessionLocal.configure(bind=async_engine)
+
+
 @pytest.fixture(scope="function")
 def auth_headers():
     return {"Authorization": "Bearer supersecrettoken123"}
 
 
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, async_session_factory):
     def override_get_db():
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    asyncio.run(client_cache.clear())
+    asyncio.run(replay_cache.clear())
     yield TestClient(app)
     app.dependency_overrides.clear()
+
+
+class FakeBroker:
+    """Broker en mémoire qui enregistre les événements publiés"""
+
+    def __init__(self):
+        self.published = []
+        self.is_connected = True
+        self.service_name = "customer-api"
+
+    async def publish_event(self, event_type, data, event_id=None, timestamp=None):
+        self.published.append(
+            {"event_type": event_type, "event_id": event_id, "data": data}
+        )
+
+    async def publish_events(self, events):
+        for event in events:
+            await self.publish_event(**event)
+        return [None] * len(events)
+
+
+@pytest.fixture(scope="function")
+def fake_broker():
+    return FakeBroker()
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.admission import AdmissionMiddleware, ConcurrencyLimiter
+
+
+def make_app(limiter):
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/clients")
+    async def slow_read():
+        await release.wait()
+        return {"ok": True}
+
+    app.add_middleware(AdmissionMiddleware, limiters={"read": limiter})
+    return app, release
+
+
+def test_overflow_gets_fast_503_with_retry_after():
+    limiter = ConcurrencyLimiter(
+        limit=1, max_queue=1, queue_timeout=5, target_latency=1
+    )
+    app, release = make_app(limiter)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            first = asyncio.create_task(http.get("/clients"))
+            queued = asyncio.create_task(http.get("/clients"))
+            await asyncio.sleep(0.05)
+            assert (limiter.in_flight, limiter.queued) == (1, 1)
+
+            rejected = await http.get("/clients")
+            release.set()
+            return rejected, await first, await queued
+
+    rejected, first, queued = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "1"
+    assert first.status_code == queued.status_code == 200
+    assert limiter.in_flight == 0
+
+
+def test_adaptive_limit_backs_off_on_slow_requests_and_recovers():
+    limiter = ConcurrencyLimiter(
+        limit=10, max_queue=0, queue_timeout=1, target_latency=0.1, adaptive=True
+    )
+
+    async def scenario():
+        for latency in (0.5, 0.5):
+            await limiter.acquire()
+            limiter.release(latency)
+        decreased = limiter.limit
+        for _ in range(20):
+            await limiter.acquire()
+            limiter.release(0.01)
+        return decreased
+
+    assert asyncio.run(scenario()) == 9
+    assert limiter.limit == 10
@@ -1,4 +1,17 @@
 # tests/test_clients.py
+import asyncio
+import csv
+import io
+import json
+
+import httpx
+import pytest
+from sqlalchemy import select, text
+
+from app.changes import CHANGES_WRITER_NAME
+from app.idempotency import replay_cache
+from app.main import app
+from app.models import OutboxEventModel
 
 
 def test_read_root(client):
@@ -16,3 +29,404 @@ def test_create_and_get_client(client, auth_headers):
     response = client.get(f"/clients/{client_id}", headers=auth_headers)
     assert response.status_code == 200
     assert response.json()["name"] == "Jean Dupont"
+
+
+def test_list_clients_cursor_pagination(client, auth_headers):
+    for i in range(5):
+        client.post("/clients", json={"name": f"Client {i}"}, headers=auth_headers)
+
+    response = client.get("/clients?limit=2", headers=auth_headers)
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page["items"]) == 2
+    assert page["next_cursor"] is not None
+
+    seen = [c["id"] for c in page["items"]]
+    while page["next_cursor"]:
+        response = client.get(
+            f"/clients?limit=2&cursor={page['next_cursor']}", headers=auth_headers
+        )
+        page = response.json()
+        seen.extend(c["id"] for c in page["items"])
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+    response = client.get("/clients?cursor=invalide", headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_export_clients_streams_ndjson_and_csv(client, auth_headers):
+    client.post("/clients", json={"name": "Jean Dupont"}, headers=auth_headers)
+    client.post(
+        "/clients", json={"name": "Marie Curie", "city": "Paris"}, headers=auth_headers
+    )
+
+    response = client.get(
+        "/clients/export?format=ndjson",
+        headers={**auth_headers, "Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    # Un flux n'est pas compressé : le premier octet part sans attendre un bloc zlib
+    assert "content-encoding" not in response.headers
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["name"] for line in lines] == ["Jean Dupont", "Marie Curie"]
+
+    response = client.get("/clients/export?format=csv", headers=auth_headers)
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows[1]["city"] == "Paris"
+
+    response = client.get("/clients/export?format=xml", headers=auth_headers)
+    assert response.status_code == 422
+
+
+def test_get_client_conditional_requests(client, auth_headers):
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    client_id = response.json()["id"]
+
+    response = client.get(f"/clients/{client_id}", headers=auth_headers)
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = client.get(
+        f"/clients/{client_id}", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(
+        f"/clients/{client_id}",
+        headers={**auth_headers, "If-Modified-Since": last_modified},
+    )
+    assert response.status_code == 304
+
+    client.put(f"/clients/{client_id}", json={"city": "Lyon"}, headers=auth_headers)
+    response = client.get(
+        f"/clients/{client_id}", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_list_clients_conditional_requests(client, auth_headers):
+    client.post("/clients", json={"name": "Jean Dupont"}, headers=auth_headers)
+
+    response = client.get("/clients", headers=auth_headers)
+    etag = response.headers["etag"]
+
+    response = client.get("/clients", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/clients", json={"name": "Marie Curie"}, headers=auth_headers)
+    response = client.get("/clients", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+
+
+def test_sparse_fieldsets_and_compression(client, auth_headers):
+    created = client.post(
+        "/clients",
+        json={"name": "Jean Dupont", "company_name": "Kawa", "city": "Paris"},
+        headers=auth_headers,
+    ).json()
+    full = client.get(f"/clients/{created['id']}", headers=auth_headers)
+    assert full.json() == created
+
+    response = client.get(
+        f"/clients/{created['id']}?fields=name,company_name", headers=auth_headers
+    )
+    assert response.json() == {
+        "id": created["id"],
+        "name": "Jean Dupont",
+        "company_name": "Kawa",
+    }
+    # Une projection est une autre représentation : ETag distinct
+    assert response.headers["etag"] != full.headers["etag"]
+
+    response = client.get("/clients?fields=name", headers=auth_headers)
+    assert response.json()["items"] == [{"id": created["id"], "name": "Jean Dupont"}]
+
+    response = client.get("/clients?fields=name,password", headers=auth_headers)
+    assert response.status_code == 400
+
+    for i in range(30):
+        client.post("/clients", json={"name": f"Client {i}"}, headers=auth_headers)
+    response = client.get(
+        "/clients", headers={**auth_headers, "Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["items"]) == 31
+
+
+def test_list_clients_filters(client, auth_headers):
+    for payload in [
+        {"name": "Jean Dupont", "last_name": "Dupont", "city": "Paris"},
+        {"name": "jeanne Martin", "last_name": "Martin", "city": "Lyon"},
+        {"name": "Marie Curie", "last_name": "Curie", "city": "Paris"},
+        {"name": "100% Bio", "company_name": "Bio SA", "postal_code": "75001"},
+    ]:
+        client.post("/clients", json=payload, headers=auth_headers)
+
+    def names(query):
+        response = client.get(f"/clients?{query}", headers=auth_headers)
+        assert response.status_code == 200
+        return sorted(item["name"] for item in response.json()["items"])
+
+    assert names("city=Paris") == ["Jean Dupont", "Marie Curie"]
+    assert names("name=JEAN") == ["Jean Dupont", "jeanne Martin"]
+    assert names("name=jean&city=Lyon") == ["jeanne Martin"]
+    assert names("last_name=cur") == ["Marie Curie"]
+    assert names("search=ART") == ["jeanne Martin"]
+    assert names("search=100%25") == ["100% Bio"]
+    assert names("company_name=Bio%20SA&postal_code=75001") == ["100% Bio"]
+    assert names("name=J&limit=1") == ["Jean Dupont"]
+
+    response = client.get("/clients?search=ab", headers=auth_headers)
+    assert response.status_code == 422
+
+
+def test_bulk_create_update_and_delete(client, auth_headers, db_session):
+    items = [{"name": f"Client {i}", "city": "Paris"} for i in range(5)]
+    items.insert(2, {"city": "Sans nom"})
+
+    response = client.post(
+        "/clients/bulk?chunk_size=2", json=items, headers=auth_headers
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["succeeded"] == 5
+    assert body["failed"] == 1
+    assert body["results"][2]["status"] == "invalid"
+    ids = [r["id"] for r in body["results"] if r["status"] == "created"]
+    assert len(set(ids)) == 5
+
+    updates = [{"id": ids[0], "city": "Lyon"}, {"id": ids[1], "name": "Renommé"}]
+    updates.append({"id": 999999, "city": "Nulle part"})
+    # Un name null est refusé seul, avant toute requête SQL
+    updates.append({"id": ids[2], "name": None})
+    response = client.patch("/clients/bulk", json=updates, headers=auth_headers)
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == [
+        "updated",
+        "updated",
+        "not_found",
+        "invalid",
+    ]
+    assert client.get(f"/clients/{ids[0]}", headers=auth_headers).json()["city"] == (
+        "Lyon"
+    )
+
+    response = client.request(
+        "DELETE",
+        "/clients/bulk",
+        json={"ids": [ids[0], ids[1], 999999]},
+        headers=auth_headers,
+    )
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == ["deleted", "deleted", "not_found"]
+    assert client.get(f"/clients/{ids[0]}", headers=auth_headers).status_code == 404
+
+    events = db_session.scalars(
+        select(OutboxEventModel.event_type).order_by(OutboxEventModel.id)
+    ).all()
+    assert events.count("customer.created") == 5
+    assert events.count("customer.updated") == 2
+    assert events.count("customer.deleted") == 2
+
+
+def test_patch_client_with_optimistic_concurrency(client, auth_headers, db_session):
+    response = client.post(
+        "/clients",
+        json={"name": "Jean Dupont", "city": "Paris"},
+        headers=auth_headers,
+    )
+    client_id = response.json()["id"]
+    etag = client.get(f"/clients/{client_id}", headers=auth_headers).headers["etag"]
+
+    response = client.patch(
+        f"/clients/{client_id}",
+        json={"city": "Lyon"},
+        headers={**auth_headers, "If-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json()["city"] == "Lyon"
+    assert response.json()["name"] == "Jean Dupont"
+    assert response.headers["etag"] != etag
+
+    # Un second éditeur avec l'ancienne version ne doit rien écraser
+    response = client.patch(
+        f"/clients/{client_id}",
+        json={"city": "Nice"},
+        headers={**auth_headers, "If-Match": etag},
+    )
+    assert response.status_code == 412
+    assert client.get(f"/clients/{client_id}", headers=auth_headers).json()["city"] == (
+        "Lyon"
+    )
+
+    response = client.delete(
+        f"/clients/{client_id}", headers={**auth_headers, "If-Match": etag}
+    )
+    assert response.status_code == 412
+    assert (
+        client.patch("/clients/999999", json={}, headers=auth_headers).status_code
+        == 404
+    )
+
+    updated = db_session.scalars(
+        select(OutboxEventModel).where(
+            OutboxEventModel.event_type == "customer.updated"
+        )
+    ).one()
+    assert updated.payload["changes"] == {"city": "Lyon"}
+    assert updated.payload["old_values"]["city"] == "Paris"
+    assert updated.payload["city"] == "Lyon"
+
+    # L'ETag d'une représentation partielle désigne la même version
+    partial_etag = client.get(
+        f"/clients/{client_id}", params={"fields": "city"}, headers=auth_headers
+    ).headers["etag"]
+    response = client.patch(
+        f"/clients/{client_id}",
+        json={"city": "Nice"},
+        headers={**auth_headers, "If-Match": partial_etag},
+    )
+    assert response.status_code == 200
+
+
+def test_changes_wait_for_open_write_transactions(
+    client, auth_headers, monkeypatch, db_engine
+):
+    if db_engine.dialect.name != "postgresql":
+        pytest.skip("pg_stat_activity propre à PostgreSQL")
+    monkeypatch.setattr("app.changes.CHANGES_SETTLE_SECONDS", 0)
+
+    # Une lecture longue (export, autre service) ne retient pas le flux
+    with db_engine.connect() as reader:
+        reader.execute(text("SELECT 1"))
+        client.post("/clients", json={"name": "Jean Dupont"}, headers=auth_headers)
+        page = client.get("/clients/changes", headers=auth_headers).json()
+        assert [item["client"]["name"] for item in page["items"]] == ["Jean Dupont"]
+        watermark = page["next_watermark"]
+        reader.rollback()
+
+    # Un lot encore en cours, horodaté avant les écritures suivantes
+    with db_engine.connect() as slow_batch:
+        slow_batch.execute(
+            text("SELECT set_config('application_name', :name, true)"),
+            {"name": CHANGES_WRITER_NAME},
+        )
+        client.post("/clients", json={"name": "Marie Curie"}, headers=auth_headers)
+        page = client.get(
+            "/clients/changes", params={"since": watermark}, headers=auth_headers
+        ).json()
+        assert page["items"] == []
+        slow_batch.rollback()
+
+    page = client.get(
+        "/clients/changes", params={"since": watermark}, headers=auth_headers
+    ).json()
+    assert [item["client"]["name"] for item in page["items"]] == ["Marie Curie"]
+
+
+def test_client_changes_feed(client, auth_headers, monkeypatch):
+    monkeypatch.setattr("app.changes.CHANGES_SETTLE_SECONDS", 0)
+    ids = [
+        client.post(
+            "/clients", json={"name": f"Client {i}"}, headers=auth_headers
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    response = client.get("/clients/changes", params={"limit": 2}, headers=auth_headers)
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == ids[:2]
+    assert page["has_more"] is True
+    page = client.get(
+        "/clients/changes",
+        params={"since": page["next_watermark"]},
+        headers=auth_headers,
+    ).json()
+    assert [(item["op"], item["id"]) for item in page["items"]] == [("created", ids[2])]
+    assert page["has_more"] is False
+    watermark = page["next_watermark"]
+
+    client.patch(f"/clients/{ids[0]}", json={"city": "Lyon"}, headers=auth_headers)
+    client.request(
+        "DELETE", "/clients/bulk", json={"ids": [ids[1]]}, headers=auth_headers
+    )
+    client.delete(f"/clients/{ids[2]}", headers=auth_headers)
+
+    page = client.get(
+        "/clients/changes", params={"since": watermark}, headers=auth_headers
+    ).json()
+    assert [(item["op"], item["id"]) for item in page["items"]] == [
+        ("updated", ids[0]),
+        ("deleted", ids[1]),
+        ("deleted", ids[2]),
+    ]
+    assert page["items"][0]["client"]["city"] == "Lyon"
+    assert page["items"][1]["client"] is None
+
+    # Rien de nouveau : le watermark reste le même
+    empty = client.get(
+        "/clients/changes",
+        params={"since": page["next_watermark"]},
+        headers=auth_headers,
+    ).json()
+    assert empty == {
+        "items": [],
+        "next_watermark": page["next_watermark"],
+        "has_more": False,
+    }
+    response = client.get(
+        "/clients/changes", params={"since": "invalide"}, headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+def test_create_client_with_idempotency_key(client, auth_headers, db_session):
+    headers = {**auth_headers, "Idempotency-Key": "commande-42"}
+    first = client.post("/clients", json={"name": "Jean Dupont"}, headers=headers)
+    assert first.status_code == 200
+
+    replayed = client.post("/clients", json={"name": "Jean Dupont"}, headers=headers)
+    assert replayed.status_code == 200
+    assert replayed.json() == first.json()
+    assert replayed.headers["idempotent-replayed"] == "true"
+
+    # Même clé, autre corps : refus plutôt que de renvoyer un autre client
+    response = client.post("/clients", json={"name": "Marie Curie"}, headers=headers)
+    assert response.status_code == 422
+
+    # Les retries concurrents attendent la première requête au lieu de créer
+    async def concurrent_retries():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            return await asyncio.gather(
+                *(
+                    http.post(
+                        "/clients",
+                        json={"name": "Paul Martin"},
+                        headers={**auth_headers, "Idempotency-Key": "commande-43"},
+                    )
+                    for _ in range(5)
+                )
+            )
+
+    responses = asyncio.run(concurrent_retries())
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["id"] for response in responses}) == 1
+
+    # Un autre réplica (cache mémoire vide) rejoue depuis la table
+    asyncio.run(replay_cache.clear())
+    replayed = client.post("/clients", json={"name": "Jean Dupont"}, headers=headers)
+    assert replayed.json() == first.json()
+
+    events = db_session.scalars(select(OutboxEventModel)).all()
+    assert len(events) == 2
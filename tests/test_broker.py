@@ -0,0 +1,192 @@
+import asyncio
+
+from app.messaging.broker import MessageBroker
+from app.messaging.supervisor import BrokerSupervisor
+
+
+class FakeExchange:
+    def __init__(self, fail_routing_key=None):
+        self.published = []
+        self.fail_routing_key = fail_routing_key
+
+    async def publish(self, message, routing_key, timeout=None):
+        await asyncio.sleep(0)
+        if routing_key == self.fail_routing_key:
+            raise RuntimeError("nack")
+        self.published.append((routing_key, message.message_id))
+
+
+def make_broker(exchange, **kwargs):
+    broker = MessageBroker("amqp://localhost/", "customer-api", **kwargs)
+    broker.events_exchange = exchange
+    return broker
+
+
+def test_pipeline_publishes_batches_with_grouped_confirms():
+    exchange = FakeExchange()
+    broker = make_broker(exchange, pipeline_enabled=True, pipeline_batch_size=2)
+
+    async def scenario():
+        broker._start_flusher()
+        results = await broker.publish_events(
+            [
+                {"event_type": "customer.created", "data": {"customer_id": i}}
+                for i in range(5)
+            ]
+        )
+        await broker.publish_event("customer.updated", {"customer_id": 1})
+        await broker.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results == [None] * 5
+    assert len(exchange.published) == 6
+    stats = broker.publisher_stats()
+    assert stats["published"] == 6
+    assert stats["batches"] >= 3
+    assert stats["queue_depth"] == 0
+
+
+def test_pipeline_reports_failures_per_event():
+    exchange = FakeExchange(fail_routing_key="customer.deleted")
+    broker = make_broker(exchange, pipeline_enabled=True)
+
+    async def scenario():
+        broker._start_flusher()
+        results = await broker.publish_events(
+            [
+                {"event_type": "customer.created", "data": {}},
+                {"event_type": "customer.deleted", "data": {}},
+            ]
+        )
+        await broker.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results[0] is None
+    assert isinstance(results[1], RuntimeError)
+    assert broker.publisher_stats()["failed"] == 1
+
+
+def test_sequential_publish_stops_at_first_failure():
+    exchange = FakeExchange(fail_routing_key="customer.updated")
+    broker = make_broker(exchange)
+
+    results = asyncio.run(
+        broker.publish_events(
+            [
+                {"event_type": "customer.created", "data": {}},
+                {"event_type": "customer.updated", "data": {}},
+                {"event_type": "customer.deleted", "data": {}},
+            ]
+        )
+    )
+
+    assert results[0] is None
+    assert all(isinstance(error, RuntimeError) for error in results[1:])
+    assert [key for key, _ in exchange.published] == ["customer.created"]
+
+
+class FlakyBroker:
+    def __init__(self, failures):
+        self.failures = failures
+        self.is_connected = False
+        self.connects = 0
+
+    async def connect(self, max_retries=5):
+        self.connects += 1
+        if self.connects <= self.failures:
+            raise ConnectionError("refused")
+        self.is_connected = True
+
+    async def close(self):
+        self.is_connected = False
+
+
+def test_supervisor_retries_in_background_until_connected():
+    broker = FlakyBroker(failures=2)
+    subscribed = []
+
+    async def on_connected():
+        subscribed.append(True)
+
+    supervisor = BrokerSupervisor(
+        broker, on_connected, initial_delay=0.01, max_delay=0.02
+    )
+
+    async def scenario():
+        supervisor.start()
+        # Le démarrage ne bloque pas sur la connexion
+        assert supervisor.state == "connecting"
+        for _ in range(100):
+            if supervisor.state == "connected":
+                break
+            await asyncio.sleep(0.01)
+        await supervisor.stop()
+
+    asyncio.run(scenario())
+
+    assert broker.connects == 3
+    assert subscribed == [True]
+    assert supervisor.stats()["attempts"] == 3
+
+
+class FakeChannel:
+    def __init__(self):
+        self.declared = {}
+        self.default_exchange = self
+        self.published = []
+
+    async def declare_queue(self, name, **kwargs):
+        self.declared[name] = kwargs.get("arguments")
+
+    async def publish(self, message, routing_key):
+        self.published.append((routing_key, message))
+
+
+class FailedMessage:
+    body = b'{"event_type": "order.created"}'
+    content_type = "application/json"
+    message_id = "event-1"
+    timestamp = None
+
+    def __init__(self, headers=None):
+        self.headers = headers
+
+
+def test_failed_events_go_through_retry_queues_then_dead_letter_queue():
+    broker = make_broker(FakeExchange(), retry_delays=[5, 30])
+    broker.channel = FakeChannel()
+    asyncio.run(broker._declare_retry_queues())
+
+    assert broker.channel.declared["customer-api.events.retry.5000ms"] == {
+        "x-message-ttl": 5000,
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": "customer-api.events",
+    }
+    assert "customer-api.events.retry.30000ms" in broker.channel.declared
+    assert "customer-api.events.dlq" in broker.channel.declared
+
+    async def fail(message):
+        return await broker.retry_or_dead_letter(message, ValueError("boom"))
+
+    assert asyncio.run(fail(FailedMessage())) == "retried"
+    routing_key, message = broker.channel.published[-1]
+    assert routing_key == "customer-api.events.retry.5000ms"
+    assert message.headers["x-retry-count"] == 1
+    assert message.headers["x-last-error"] == "ValueError: boom"
+    assert message.body == FailedMessage.body
+
+    assert asyncio.run(fail(FailedMessage(message.headers))) == "retried"
+    assert broker.channel.published[-1][0] == "customer-api.events.retry.30000ms"
+
+    assert asyncio.run(fail(FailedMessage({"x-retry-count": 2}))) == "dead_lettered"
+    assert broker.channel.published[-1][0] == "customer-api.events.dlq"
+
+    unreadable = broker.retry_or_dead_letter(
+        FailedMessage(), ValueError("bad json"), retry=False
+    )
+    assert asyncio.run(unreadable) == "dead_lettered"
+    assert broker.channel.published[-1][0] == "customer-api.events.dlq"
@@ -0,0 +1,112 @@
+import asyncio
+
+import fnmatch
+
+from app.cache import ClientCache, InMemoryCache, RedisCache, client_cache
+
+
+def test_in_memory_cache_evicts_lru_and_expires():
+    async def scenario():
+        cache = InMemoryCache(max_size=2, ttl=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+
+        expired = InMemoryCache(ttl=-1)
+        await expired.set("a", 1)
+        assert await expired.get("a") is None
+
+        # Un TTL passé à set() remplace celui du cache
+        await cache.set("d", 4, ttl=-1)
+        assert await cache.get("d") is None
+
+    asyncio.run(scenario())
+
+
+class FakeRedis:
+    def __init__(self, keys):
+        self.keys = set(keys)
+
+    async def scan_iter(self, match, count):
+        for key in list(self.keys):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def unlink(self, *keys):
+        self.keys.difference_update(keys)
+
+
+def test_clear_only_removes_the_cache_keys():
+    async def scenario():
+        memory = InMemoryCache()
+        await memory.set("client:1", 1)
+        await memory.set("session:1", 2)
+        await ClientCache(memory).clear()
+        assert await memory.get("client:1") is None
+        assert await memory.get("session:1") == 2
+
+        # Redis peut être partagé avec d'autres usages : pas de FLUSHDB
+        redis = RedisCache.__new__(RedisCache)
+        redis._redis = FakeRedis({"client:1", "client:2", "session:1"})
+        await ClientCache(redis).clear()
+        assert redis._redis.keys == {"session:1"}
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_load_once():
+    cache = ClientCache(InMemoryCache())
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(cache.get_or_load(1, loader) for _ in range(10))
+        )
+        assert all(result == {"id": 1} for result in results)
+        assert await cache.get_or_load(1, loader) == {"id": 1}
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidation_during_load_is_not_overwritten():
+    cache = ClientCache(InMemoryCache())
+
+    async def scenario():
+        async def loader():
+            await cache.invalidate(1)
+            return {"id": 1, "name": "ancien"}
+
+        await cache.get_or_load(1, loader)
+        assert await cache.backend.get("client:1") is None
+
+    asyncio.run(scenario())
+
+
+def test_get_client_is_cached_and_invalidated_on_update(client, auth_headers):
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    client_id = response.json()["id"]
+
+    client.get(f"/clients/{client_id}", headers=auth_headers)
+    hits = client_cache.hits
+    client.get(f"/clients/{client_id}", headers=auth_headers)
+    assert client_cache.hits == hits + 1
+
+    client.put(f"/clients/{client_id}", json={"city": "Lyon"}, headers=auth_headers)
+    response = client.get(f"/clients/{client_id}", headers=auth_headers)
+    assert response.json()["city"] == "Lyon"
+
+    client.delete(f"/clients/{client_id}", headers=auth_headers)
+    response = client.get(f"/clients/{client_id}", headers=auth_headers)
+    assert response.status_code == 404
@@ -0,0 +1,190 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from app.messaging.consumer import ConcurrentConsumer, EventDispatcher
+from app.processed_events import ProcessedEvents
+
+
+class FakeIncomingMessage:
+    def __init__(self, event):
+        self.body = json.dumps(event).encode()
+        self.acked = False
+        self.rejected = False
+        self.requeued = False
+
+    @asynccontextmanager
+    async def process(self, ignore_processed=False):
+        yield
+        self.acked = True
+
+    async def reject(self, requeue=False):
+        self.rejected = True
+
+    async def nack(self, requeue=True):
+        self.requeued = requeue
+
+
+def order_event(customer_id, seq):
+    return {
+        "event_type": "order.created",
+        "event_id": f"{customer_id}-{seq}",
+        "timestamp": "2025-01-20T18:30:00+00:00",
+        "data": {"customer_id": customer_id, "seq": seq},
+    }
+
+
+def test_consumer_keeps_order_per_customer_and_parallelizes_across_customers():
+    dispatcher = EventDispatcher()
+    handled = []
+    active = {"now": 0, "max": 0}
+
+    @dispatcher.on("order.created")
+    async def handle(event):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        data = event["data"]
+        # Les premiers messages sont les plus lents : sans ordonnancement, ils finiraient après
+        await asyncio.sleep(0.02 / (data["seq"] + 1))
+        handled.append((data["customer_id"], data["seq"]))
+        active["now"] -= 1
+
+    consumer = ConcurrentConsumer(dispatcher, concurrency=3)
+    messages = [
+        FakeIncomingMessage(order_event(customer_id, seq))
+        for seq in range(4)
+        for customer_id in (1, 2, 3, 4)
+    ]
+
+    async def scenario():
+        await asyncio.gather(*(consumer(message) for message in messages))
+
+    asyncio.run(scenario())
+
+    for customer_id in (1, 2, 3, 4):
+        seqs = [seq for cid, seq in handled if cid == customer_id]
+        assert seqs == [0, 1, 2, 3]
+    assert 1 < active["max"] <= 3
+    assert all(message.acked for message in messages)
+
+    stats = consumer.consumer_stats()
+    assert stats["processed"] == 16
+    assert stats["pending_keys"] == 0
+    assert stats["max_lag"] > 0
+
+
+def test_consumer_acks_unknown_events_and_rejects_invalid_json():
+    consumer = ConcurrentConsumer(EventDispatcher())
+    unknown = FakeIncomingMessage({"event_type": "product.created", "data": {}})
+    invalid = FakeIncomingMessage({})
+    invalid.body = b"not json"
+
+    async def scenario():
+        await consumer(unknown)
+        await consumer(invalid)
+
+    asyncio.run(scenario())
+
+    assert unknown.acked
+    assert invalid.rejected
+    assert consumer.stats["ignored"] == 1
+
+
+def test_consumer_skips_redelivered_events(async_session_factory):
+    dispatcher = EventDispatcher()
+    handled = []
+
+    @dispatcher.on("order.created")
+    async def handle(event):
+        handled.append(event["event_id"])
+
+    registry = ProcessedEvents(async_session_factory)
+    event = order_event(1, 0)
+
+    async def scenario():
+        await ConcurrentConsumer(dispatcher, processed_events=registry)(
+            FakeIncomingMessage(event)
+        )
+        # Après un redémarrage, le LRU est vide : la table prend le relais
+        restarted = ConcurrentConsumer(
+            dispatcher, processed_events=ProcessedEvents(async_session_factory)
+        )
+        await restarted(FakeIncomingMessage(event))
+        await restarted(FakeIncomingMessage(event))
+        return restarted
+
+    restarted = asyncio.run(scenario())
+
+    assert handled == ["1-0"]
+    assert restarted.stats["duplicates"] == 2
+    assert restarted.processed_events.stats["database_hits"] == 1
+    assert restarted.processed_events.stats["memory_hits"] == 1
+
+
+def test_consumer_hands_failed_events_to_retry():
+    dispatcher = EventDispatcher()
+    failures = []
+
+    @dispatcher.on("order.created")
+    async def handle(event):
+        raise ValueError("boom")
+
+    async def retry(message, error, retry=True):
+        failures.append(str(error))
+        if len(failures) > 1:
+            raise ConnectionError("broker down")
+        return "retried"
+
+    consumer = ConcurrentConsumer(dispatcher, on_failure=retry)
+    retried = FakeIncomingMessage(order_event(1, 0))
+    requeued = FakeIncomingMessage(order_event(1, 1))
+
+    async def scenario():
+        await consumer(retried)
+        await consumer(requeued)
+
+    asyncio.run(scenario())
+
+    assert failures == ["boom", "boom"]
+    assert retried.acked and not retried.requeued
+    # Republication impossible : le message est rendu à la file plutôt que perdu
+    assert requeued.requeued
+    assert consumer.stats["retried"] == 1
+    assert consumer.stats["failed"] == 2
+
+
+def test_consumer_dead_letters_invalid_json_and_batches_dedupe(async_session_factory):
+    dispatcher = EventDispatcher()
+    handled = []
+
+    @dispatcher.on("order.created")
+    async def handle(event):
+        handled.append(event["event_id"])
+
+    dead_lettered = []
+
+    async def on_failure(message, error, retry=True):
+        dead_lettered.append(retry)
+        return "dead_lettered"
+
+    registry = ProcessedEvents(async_session_factory)
+    consumer = ConcurrentConsumer(
+        dispatcher, concurrency=20, processed_events=registry, on_failure=on_failure
+    )
+    invalid = FakeIncomingMessage({})
+    invalid.body = b"not json"
+    messages = [
+        FakeIncomingMessage(order_event(customer_id, 0)) for customer_id in range(20)
+    ]
+
+    async def scenario():
+        await asyncio.gather(consumer(invalid), *(consumer(m) for m in messages))
+
+    asyncio.run(scenario())
+
+    assert dead_lettered == [False]
+    assert invalid.acked and not invalid.rejected
+    assert consumer.stats["dead_lettered"] == 1
+    assert len(handled) == 20
+    # 20 messages en parallèle : une lecture et une écriture groupées
+    assert registry.stats["batches"] == 2
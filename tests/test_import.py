@@ -0,0 +1,89 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.importer import iter_csv_records
+from app.models import ClientModel, OutboxEventModel
+
+CSV_FILE = (
+    "﻿name,username,city,company_name\n"
+    "Jean Dupont,jdupont,Paris,\n"
+    ",sans-nom,Lyon,\n"
+    'Marie Curie,mcurie,Paris,"Radium\n& Cie"\n'
+    "Paul Martin,,Nice,Kawa\n"
+)
+
+
+def test_csv_records_are_parsed_across_chunks():
+    async def chunks():
+        data = CSV_FILE.encode("utf-8")
+        for start in range(0, len(data), 7):
+            yield data[start : start + 7]
+
+    async def collect():
+        return [record async for record in iter_csv_records(chunks())]
+
+    records = asyncio.run(collect())
+    assert [row for row, _ in records] == [2, 3, 4, 6]
+    assert records[2][1]["company_name"] == "Radium\n& Cie"
+    assert records[0][1]["company_name"] is None
+
+
+def test_import_csv_reports_rejected_rows_and_writes_events(
+    client, auth_headers, db_session
+):
+    response = client.post(
+        "/clients/import?chunk_size=2",
+        content=CSV_FILE.encode("utf-8"),
+        headers={**auth_headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["processed"] == 4
+    assert summary["created"] == 3
+    assert summary["rejected"] == 1
+    assert summary["rejected_rows"][0]["row"] == 3
+
+    names = db_session.scalars(select(ClientModel.name).order_by(ClientModel.id)).all()
+    assert names == ["Jean Dupont", "Marie Curie", "Paul Martin"]
+    events = db_session.scalars(select(OutboxEventModel.event_type)).all()
+    assert events == ["customer.created"] * 3
+
+
+def test_import_ndjson_upserts_on_username(client, auth_headers, db_session):
+    client.post(
+        "/clients",
+        json={"name": "Jean Dupont", "username": "jdupont", "city": "Paris"},
+        headers=auth_headers,
+    )
+    lines = [
+        '{"name": "Jean Dupont", "username": "jdupont", "city": "Lyon"}',
+        '{"name": "Jean Dupont", "username": "jdupont", "city": "Lille"}',
+        '{"name": "Marie Curie", "username": "mcurie"}',
+        "pas du json",
+        '{"name": null, "username": "jdupont"}',
+    ]
+    response = client.post(
+        "/clients/import?format=ndjson&upsert=true",
+        content="\n".join(lines).encode("utf-8"),
+        headers=auth_headers,
+    )
+    summary = response.json()
+    assert (summary["created"], summary["updated"], summary["superseded"]) == (1, 1, 1)
+    assert summary["rejected_rows"][0] == {"row": 4, "errors": "Ligne illisible"}
+    assert summary["rejected_rows"][1]["row"] == 5
+
+    cities = db_session.execute(
+        select(ClientModel.username, ClientModel.city).order_by(ClientModel.id)
+    ).all()
+    assert cities == [("jdupont", "Lille"), ("mcurie", None)]
+    update = db_session.scalars(
+        select(OutboxEventModel).where(
+            OutboxEventModel.event_type == "customer.updated"
+        )
+    ).one()
+    assert update.payload["changes"] == {"city": "Lille"}
+    assert update.payload["old_values"]["city"] == "Paris"
+
+    response = client.post("/clients/import", content=b"name\n", headers=auth_headers)
+    assert response.status_code == 415
@@ -0,0 +1,57 @@
+import io
+import json
+import logging
+import queue
+
+from app.log import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    request_id_var,
+)
+
+
+def test_queue_handler_writes_json_with_context_and_never_blocks():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger("tests.log.queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    token = request_id_var.set("req-1")
+    try:
+        logger.info("Client %s créé", 42, extra={"client_id": 42})
+    finally:
+        request_id_var.reset(token)
+    logger.info("deuxième")
+    # File pleine : le message est compté, pas attendu
+    logger.info("troisième")
+    logger.removeHandler(handler)
+
+    assert handler.dropped == 1
+    stream = io.StringIO()
+    writer = logging.StreamHandler(stream)
+    writer.setFormatter(JsonFormatter())
+    writer.handle(handler.queue.get_nowait())
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Client 42 créé"
+    assert entry["request_id"] == "req-1"
+    assert entry["client_id"] == 42
+    assert entry["level"] == "INFO"
+
+
+def test_sampling_keeps_warnings_and_drops_sampled_info():
+    sampling = SamplingFilter({"app.messaging.events": 0.0})
+
+    def record(name, level):
+        return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+    assert not sampling.filter(record("app.messaging.events", logging.INFO))
+    assert sampling.filter(record("app.messaging.events", logging.WARNING))
+    assert sampling.filter(record("app.messaging.broker", logging.INFO))
+
+
+def test_request_id_is_echoed_or_generated(client):
+    response = client.get("/", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["x-request-id"] == "abc-123"
+    assert len(client.get("/").headers["x-request-id"]) == 32
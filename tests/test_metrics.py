@@ -0,0 +1,100 @@
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import instrument_engine, pool_collector, register_collector
+from app.timing import RequestTimings, _current, install_sql_timing
+
+
+def test_pool_collector_renders_one_family_per_metric():
+    registry = CollectorRegistry()
+    primary = create_engine("sqlite://", poolclass=QueuePool, pool_size=5)
+    replica = create_engine("sqlite://", poolclass=QueuePool, pool_size=3)
+    register_collector(
+        pool_collector({"primary": primary, "replica": replica}), registry
+    )
+    # Un collecteur en échec n'empêche pas le scrape des autres
+    register_collector(lambda: 1 / 0, registry)
+
+    body = generate_latest(registry).decode()
+    assert body.count("# TYPE db_pool_size gauge") == 1
+    assert 'db_pool_size{engine="primary"} 5.0' in body
+    assert 'db_pool_size{engine="replica"} 3.0' in body
+    primary.dispose()
+    replica.dispose()
+
+
+def test_metrics_endpoint_uses_route_templates(client, auth_headers):
+    client.get("/clients/424242", headers=auth_headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/clients/{client_id}",status="404"}' in response.text
+    )
+    assert "/clients/424242" not in response.text
+    assert "db_query_duration_seconds" in response.text
+
+
+def test_debug_timing_header_returns_server_timing(client, auth_headers, caplog):
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    assert "server-timing" not in response.headers
+    client_id = response.json()["id"]
+
+    response = client.put(
+        f"/clients/{client_id}",
+        json={"city": "Lyon"},
+        headers={**auth_headers, "X-Debug-Timing": "1"},
+    )
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    for name in ("db;dur=", "outbox;dur=", "app;dur=", "total;dur="):
+        assert name in timing
+
+    logged = [
+        record for record in caplog.records if record.getMessage() == "request_timing"
+    ]
+    assert logged[-1].route == "/clients/{client_id}"
+    assert logged[-1].timings["db"]["count"] >= 2
+
+
+def test_readiness_checks_database_but_not_broker(client):
+    assert client.get("/health").status_code == 200
+
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["database"] == "ok"
+    # Broker absent en test : signalé, sans rendre l'instance indisponible
+    assert body["message_broker"]["state"] != "connected"
+
+
+def test_failed_statements_do_not_shift_query_timings():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    install_sql_timing()
+    timings = RequestTimings()
+
+    token = _current.set(timings)
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            connection.execute(text("SELECT 1"))
+            # L'échec n'a laissé aucune instruction « en cours » derrière lui
+            assert connection.info["query_start"] == {}
+            assert connection.info["timing_start"] == {}
+    finally:
+        _current.reset(token)
+        engine.dispose()
+
+    assert [statement for _, statement in timings.statements] == [
+        "SELECT * FROM missing_table",
+        "SELECT 1",
+    ]
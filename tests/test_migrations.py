@@ -0,0 +1,80 @@
+import warnings
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import Base
+
+
+def alembic_config(url):
+    config = Config(str(Path(__file__).parent.parent / "alembic.ini"))
+    config.attributes["database_url"] = url
+    return config
+
+
+def test_migrations_match_models(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    config = alembic_config(url)
+    command.upgrade(config, "head")
+
+    engine = create_engine(url)
+    with engine.connect() as connection, warnings.catch_warnings():
+        # SQLite ne sait pas refléter les index sur expression (lower(...))
+        warnings.simplefilter("ignore")
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+    assert diff == []
+
+    with engine.connect() as connection:
+        indexes = set(
+            connection.scalars(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            )
+        )
+    assert {"ix_clients_name_lower", "ix_clients_updated_at_id"} <= indexes
+
+    command.downgrade(config, "base")
+    assert inspect(engine).get_table_names() == ["alembic_version"]
+    engine.dispose()
+
+
+def test_legacy_create_all_database_is_upgraded_from_baseline(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(url)
+    # Base créée par l'ancien create_all : seule la table clients existe
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE clients (id INTEGER NOT NULL, name VARCHAR NOT NULL, "
+                "username VARCHAR, first_name VARCHAR, last_name VARCHAR, "
+                "postal_code VARCHAR, city VARCHAR, profile_first_name VARCHAR, "
+                "profile_last_name VARCHAR, company_name VARCHAR, "
+                "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, "
+                "PRIMARY KEY (id))"
+            )
+        )
+        connection.execute(text("CREATE INDEX ix_clients_id ON clients (id)"))
+        connection.execute(
+            text(
+                "INSERT INTO clients (name, created_at, updated_at) "
+                "VALUES ('Jean Dupont', '2025-01-20 10:00:00', '2025-01-20 10:00:00')"
+            )
+        )
+
+    config = alembic_config(url)
+    command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+    with engine.connect() as connection, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+        names = connection.scalars(text("SELECT name FROM clients")).all()
+    assert diff == []
+    assert names == ["Jean Dupont"]
+    assert {"outbox_events", "order_events", "processed_events"} <= set(
+        inspect(engine).get_table_names()
+    )
+    engine.dispose()
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.models import OrderEventModel
+from app.order_stats import OrderStatsProjector, apply_order_events
+
+
+def order_event(event_id, event_type, customer_id, timestamp):
+    return {
+        "event_id": event_id,
+        "event_type": event_type,
+        "timestamp": timestamp,
+        "data": {"customer_id": customer_id},
+    }
+
+
+def test_order_events_are_projected_once(client, auth_headers, async_session_factory):
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    client_id = response.json()["id"]
+
+    events = [
+        order_event("e1", "order.created", client_id, "2025-01-20T10:00:00+00:00"),
+        order_event("e2", "order.created", client_id, "2025-01-21T10:00:00+00:00"),
+        order_event("e3", "order.cancelled", client_id, "2025-01-22T10:00:00+00:00"),
+    ]
+
+    async def apply(batch):
+        async with async_session_factory() as db:
+            applied = await apply_order_events(db, batch)
+            await db.commit()
+            return applied
+
+    assert asyncio.run(apply(events[:2])) == 2
+    # Redélivrance de e2 dans un nouveau lot : seul e3 est appliqué
+    assert asyncio.run(apply(events[1:])) == 1
+
+    response = client.get(f"/clients/{client_id}/stats", headers=auth_headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["order_count"] == 2
+    assert stats["cancelled_count"] == 1
+    assert stats["last_order_at"].startswith("2025-01-21T10:00:00")
+
+    response = client.get(f"/clients/{client_id}?include=stats", headers=auth_headers)
+    assert response.json()["order_stats"]["order_count"] == 2
+
+
+def test_projector_batches_concurrent_events(
+    client, auth_headers, async_session_factory
+):
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    client_id = response.json()["id"]
+    projector = OrderStatsProjector(async_session_factory, batch_size=5)
+
+    async def scenario():
+        await asyncio.gather(
+            *(
+                projector.submit(
+                    order_event(
+                        f"e{i}", "order.created", client_id, "2025-01-20T10:00:00"
+                    )
+                )
+                for i in range(12)
+            )
+        )
+
+    asyncio.run(scenario())
+
+    response = client.get(f"/clients/{client_id}/stats", headers=auth_headers)
+    assert response.json()["order_count"] == 12
+
+
+def test_stats_of_client_without_orders(client, auth_headers):
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    client_id = response.json()["id"]
+
+    response = client.get(f"/clients/{client_id}/stats", headers=auth_headers)
+    assert response.json() == {
+        "customer_id": client_id,
+        "order_count": 0,
+        "cancelled_count": 0,
+        "last_order_at": None,
+    }
+    assert client.get("/clients/999999/stats", headers=auth_headers).status_code == 404
+
+
+def test_projector_purges_expired_event_ids(
+    client, auth_headers, async_session_factory
+):
+    client_id = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    ).json()["id"]
+    projector = OrderStatsProjector(async_session_factory, retention_hours=1)
+
+    async def scenario():
+        await projector.submit(
+            order_event("old", "order.created", client_id, "2025-01-20T10:00:00")
+        )
+        async with async_session_factory() as db:
+            await db.execute(
+                update(OrderEventModel).values(
+                    recorded_at=datetime.now(timezone.utc) - timedelta(hours=2)
+                )
+            )
+            await db.commit()
+        projector._last_purge = datetime.min.replace(tzinfo=timezone.utc)
+        await projector.submit(
+            order_event("new", "order.created", client_id, "2025-01-21T10:00:00")
+        )
+        async with async_session_factory() as db:
+            return (await db.scalars(select(OrderEventModel.event_id))).all()
+
+    assert asyncio.run(scenario()) == ["new"]
+
+
+def test_projector_fails_only_the_bad_event_of_a_batch(
+    client, auth_headers, async_session_factory
+):
+    client_id = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    ).json()["id"]
+    projector = OrderStatsProjector(async_session_factory, batch_size=3)
+
+    async def scenario():
+        return await asyncio.gather(
+            projector.submit(
+                order_event("e1", "order.created", client_id, "2025-01-20T10:00:00")
+            ),
+            projector.submit(
+                order_event("e2", "order.created", "abc", "2025-01-20T10:00:00")
+            ),
+            # Refusé par la base (type d'événement NULL) : le lot est rejoué un à un
+            projector.submit(order_event("e3", None, client_id, "2025-01-20T10:00:00")),
+            projector.submit(
+                order_event("e4", "order.created", client_id, "2025-01-21T10:00:00")
+            ),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert results[0] is None and results[3] is None
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], Exception)
+
+    response = client.get(f"/clients/{client_id}/stats", headers=auth_headers)
+    assert response.json()["order_count"] == 2
@@ -0,0 +1,153 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.messaging.coalescer import coalesce
+from app.models import OutboxEventModel
+from app.outbox import OutboxRelay
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+
+def test_writes_are_recorded_in_outbox(client, auth_headers, db_session):
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    client_id = response.json()["id"]
+    client.put(f"/clients/{client_id}", json={"city": "Lyon"}, headers=auth_headers)
+    client.delete(f"/clients/{client_id}", headers=auth_headers)
+
+    events = db_session.scalars(
+        select(OutboxEventModel).order_by(OutboxEventModel.id)
+    ).all()
+    assert [event.event_type for event in events] == [
+        "customer.created",
+        "customer.updated",
+        "customer.deleted",
+    ]
+    assert all(event.payload["customer_id"] == client_id for event in events)
+    assert all(event.sent_at is None for event in events)
+
+
+def test_relay_publishes_pending_events_in_batches(
+    client, auth_headers, async_session_factory, fake_broker
+):
+    for i in range(3):
+        client.post("/clients", json={"name": f"Client {i}"}, headers=auth_headers)
+
+    relay = OutboxRelay(fake_broker, async_session_factory, batch_size=2)
+    assert asyncio.run(relay.drain_once()) == 2
+    assert asyncio.run(relay.drain_once()) == 1
+    assert asyncio.run(relay.drain_once()) == 0
+
+    names = [event["data"]["name"] for event in fake_broker.published]
+    assert names == ["Client 0", "Client 1", "Client 2"]
+    assert len({event["event_id"] for event in fake_broker.published}) == 3
+
+
+def test_relay_keeps_events_while_broker_is_down(
+    client, auth_headers, async_session_factory, fake_broker
+):
+    client.post("/clients", json={"name": "Jean Dupont"}, headers=auth_headers)
+    fake_broker.is_connected = False
+
+    relay = OutboxRelay(fake_broker, async_session_factory)
+    assert asyncio.run(relay.drain_once()) == 0
+
+    fake_broker.is_connected = True
+    assert asyncio.run(relay.drain_once()) == 1
+
+
+def test_only_one_relay_publishes_at_a_time(
+    client, auth_headers, async_session_factory, fake_broker
+):
+    if not SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
+        pytest.skip("verrou consultatif propre à PostgreSQL")
+    client.post("/clients", json={"name": "Jean Dupont"}, headers=auth_headers)
+    relay = OutboxRelay(fake_broker, async_session_factory)
+
+    async def scenario():
+        # Un autre réplica détient le verrou du relais
+        async with async_session_factory() as leader:
+            assert await OutboxRelay._acquire_leadership(leader)
+            assert await relay.drain_once() == 0
+        return await relay.drain_once()
+
+    assert asyncio.run(scenario()) == 1
+
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def outbox_event(event_id, event_type, customer_id, age, **data):
+    return {
+        "event_id": event_id,
+        "event_type": event_type,
+        "data": {"customer_id": customer_id, **data},
+        "timestamp": NOW - timedelta(seconds=age),
+    }
+
+
+def test_coalesce_merges_updates_and_lets_deletes_supersede():
+    events = [
+        outbox_event(
+            "u1",
+            "customer.updated",
+            1,
+            10,
+            city="Lyon",
+            changes={"city": "Lyon"},
+            old_values={"city": "Paris", "name": "A"},
+        ),
+        outbox_event("u2", "customer.updated", 2, 10, changes={"name": "B"}),
+        outbox_event(
+            "u3",
+            "customer.updated",
+            1,
+            8,
+            city="Nice",
+            name="Z",
+            changes={"city": "Nice", "name": "Z"},
+            old_values={"city": "Lyon", "name": "A"},
+        ),
+        outbox_event("d2", "customer.deleted", 2, 7),
+        outbox_event("u4", "customer.updated", 3, 1, changes={"name": "C"}),
+    ]
+
+    publish, held = coalesce(events, NOW, window=5)
+
+    assert [(item["event_id"], covered) for item, covered in publish] == [
+        ("u3", ["u1", "u3"]),
+        ("d2", ["u2", "d2"]),
+    ]
+    merged = publish[0][0]["data"]
+    assert merged["changes"] == {"city": "Nice", "name": "Z"}
+    assert merged["old_values"] == {"city": "Paris", "name": "A"}
+    assert merged["coalesced_event_ids"] == ["u1", "u3"]
+    # Fenêtre pas encore écoulée pour le client 3
+    assert held == {"u4"}
+
+
+def test_relay_coalesces_bursts_of_updates(
+    client, auth_headers, async_session_factory, fake_broker
+):
+    client_id = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    ).json()["id"]
+    for city in ("Lyon", "Nice", "Lille"):
+        client.patch(f"/clients/{client_id}", json={"city": city}, headers=auth_headers)
+
+    relay = OutboxRelay(fake_broker, async_session_factory, coalesce_window=60)
+    assert asyncio.run(relay.drain_once()) == 1
+    assert [event["event_type"] for event in fake_broker.published] == [
+        "customer.created"
+    ]
+
+    relay.coalesce_window = 0.001
+    assert asyncio.run(relay.drain_once()) == 3
+    update = fake_broker.published[-1]
+    assert update["event_type"] == "customer.updated"
+    assert update["data"]["city"] == "Lille"
+    assert update["data"]["old_values"]["city"] is None
+    assert len(update["data"]["coalesced_event_ids"]) == 3
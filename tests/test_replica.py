@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.db
+from app.cache import CACHE_REPLICA_TTL, client_cache
+from app.db import (
+    READ_PRIMARY_COOKIE,
+    READ_PRIMARY_HEADER,
+    open_read_session,
+    to_async_url,
+)
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+
+def broken_replica():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:////nonexistent/replica.db", poolclass=NullPool
+    )
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def working_replica():
+    # Même base que le primaire, mais un engine distinct : vu comme le réplica
+    engine = create_async_engine(
+        to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+    )
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def test_reads_fall_back_to_primary_when_replica_is_down(
+    client, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(app.db, "ReplicaSessionLocal", broken_replica())
+    monkeypatch.setattr(app.db, "_replica_down_until", 0.0)
+
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    # L'écriture épingle les lectures suivantes de ce client sur le primaire
+    assert READ_PRIMARY_COOKIE in response.cookies
+    client.cookies.clear()
+
+    response = client.get("/clients", headers=auth_headers)
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()["items"]] == ["Jean Dupont"]
+    assert app.db._replica_down_until > 0
+
+
+def test_pinned_reads_skip_the_replica(async_session_factory, monkeypatch):
+    monkeypatch.setattr(app.db, "ReplicaSessionLocal", broken_replica())
+    monkeypatch.setattr(app.db, "_replica_down_until", 0.0)
+
+    async def scenario():
+        db = await open_read_session(pinned=True)
+        await db.close()
+        return db
+
+    db = asyncio.run(scenario())
+    assert db.bind is async_session_factory.kw["bind"]
+    assert app.db._replica_down_until == 0.0
+
+
+def test_header_pins_reads_for_callers_without_cookies(
+    client, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(app.db, "ReplicaSessionLocal", broken_replica())
+    monkeypatch.setattr(app.db, "_replica_down_until", 0.0)
+
+    response = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    )
+    assert response.headers[READ_PRIMARY_HEADER] == str(app.db.REPLICA_PIN_SECONDS)
+    client.cookies.clear()
+
+    response = client.get(
+        f"/clients/{response.json()['id']}",
+        headers={**auth_headers, READ_PRIMARY_HEADER: "1"},
+    )
+    assert response.status_code == 200
+    assert app.db._replica_down_until == 0.0
+
+
+def test_replica_reads_are_cached_with_a_short_ttl(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(app.db, "ReplicaSessionLocal", working_replica())
+    monkeypatch.setattr(app.db, "_replica_down_until", 0.0)
+
+    client_id = client.post(
+        "/clients", json={"name": "Jean Dupont"}, headers=auth_headers
+    ).json()["id"]
+    client.cookies.clear()
+
+    assert client.get(f"/clients/{client_id}", headers=auth_headers).status_code == 200
+    expires_at, _ = client_cache.backend._entries[f"client:{client_id}"]
+    assert expires_at - time.monotonic() <= CACHE_REPLICA_TTL
+
+    # Une lecture épinglée ne sert pas l'entrée venue du réplica
+    hits = client_cache.hits
+    response = client.get(
+        f"/clients/{client_id}", headers={**auth_headers, READ_PRIMARY_HEADER: "1"}
+    )
+    assert response.json()["name"] == "Jean Dupont"
+    assert client_cache.hits == hits